@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+from cachetools import LRUCache
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from db.database import SessionLocal, dialect_insert
+from db.models import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+class MemoryCache:
+    """
+    In-process LRU cache with a per-entry time-to-live.
+
+    Attributes:
+        hits (int): Lookups answered by this cache.
+        misses (int): Lookups not found or expired.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._entries: LRUCache = LRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: int):
+        """Stores a value for `ttl` seconds."""
+        self._entries[key] = (time.time() + ttl, value)
+
+class RedisCache:
+    """
+    Redis-backed cache of JSON-serialisable values, shared by all workers.
+
+    Redis failures are logged and treated as cache misses so that the
+    cache never breaks the caller.
+
+    Attributes:
+        hits (int): Lookups answered by this cache.
+        misses (int): Lookups not found, expired or failed.
+    """
+
+    def __init__(self, redis: Redis, prefix: str):
+        self._redis = redis
+        self._prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None if it is missing or unavailable."""
+        try:
+            value = await self._redis.get(f"{self._prefix}:{key}")
+        except RedisError as e:
+            logger.warning("Redis cache read failed for %s: %s", self._prefix, e)
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: int):
+        """Stores a value for `ttl` seconds."""
+        try:
+            await self._redis.set(f"{self._prefix}:{key}", json.dumps(value), ex=ttl)
+        except RedisError as e:
+            logger.warning("Redis cache write failed for %s: %s", self._prefix, e)
+
+class DatabaseCache:
+    """
+    Database-backed cache of JSON-serialisable values in the cache_entries table.
+
+    Each operation uses its own short-lived session in a worker thread, so
+    the cache neither blocks the event loop nor shares the caller's session.
+    Database failures are logged and treated as cache misses.
+
+    Attributes:
+        hits (int): Lookups answered by this cache.
+        misses (int): Lookups not found, expired or failed.
+    """
+
+    def __init__(self, prefix: str, session_factory: Callable[[], Session] = SessionLocal):
+        self._prefix = prefix
+        self._session_factory = session_factory
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None if it is missing, expired or unavailable."""
+        try:
+            value = await asyncio.to_thread(self._get, f"{self._prefix}:{key}")
+        except SQLAlchemyError as e:
+            logger.warning("Database cache read failed for %s: %s", self._prefix, e)
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int):
+        """Stores a value for `ttl` seconds."""
+        try:
+            await asyncio.to_thread(self._set, f"{self._prefix}:{key}", value, ttl)
+        except SQLAlchemyError as e:
+            logger.warning("Database cache write failed for %s: %s", self._prefix, e)
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._session_factory() as db:
+            entry = db.get(CacheEntry, key)
+            if entry is None:
+                return None
+
+            expires_at = entry.expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at <= datetime.now(timezone.utc):
+                db.delete(entry)
+                db.commit()
+                return None
+            return entry.value
+
+    def _set(self, key: str, value: Any, ttl: int):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        with self._session_factory() as db:
+            stmt = dialect_insert(db, CacheEntry).values(
+                key=key, value=value, expires_at=expires_at
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={"value": stmt.excluded.value, "expires_at": stmt.excluded.expires_at}
+            )
+            db.execute(stmt)
+            db.commit()
+
+class TieredCache:
+    """
+    Chains caches from fastest to slowest.
+
+    Reads return the first hit and backfill the faster tiers; writes go to
+    every tier.
+    """
+
+    def __init__(self, *tiers, ttl: int):
+        self.tiers = tiers
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns the value from the fastest tier that holds it."""
+        for idx, tier in enumerate(self.tiers):
+            value = await tier.get(key)
+            if value is not None:
+                for faster_tier in self.tiers[:idx]:
+                    await faster_tier.set(key, value, self.ttl)
+                return value
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Stores a value in every tier."""
+        for tier in self.tiers:
+            await tier.set(key, value, ttl or self.ttl)
@@ -0,0 +1,86 @@
+import importlib.util
+import logging
+import os
+from typing import Any, Dict, Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "False").lower() in ("true", "1")
+
+_client: Optional[httpx.AsyncClient] = None
+_stats = {"requests": 0, "connections_opened": 0}
+
+async def _trace(event_name: str, _info: Dict[str, Any]):
+    """Counts new connections from httpcore trace events."""
+    if event_name == "connection.connect_tcp.complete":
+        _stats["connections_opened"] += 1
+
+async def _on_request(request: httpx.Request):
+    """Counts outgoing requests and attaches the connection trace hook."""
+    _stats["requests"] += 1
+    request.extensions["trace"] = _trace
+
+def _http2_available() -> bool:
+    """Checks whether HTTP/2 was requested and the optional h2 package is installed."""
+    if not HTTP2_ENABLED:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; "
+                       "falling back to HTTP/1.1.")
+        return False
+    return True
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide outbound HTTP client, creating it on first use.
+
+    The client keeps connections alive between requests, so CORE and other
+    external APIs pay the TCP and TLS handshake once per connection rather
+    than once per call.
+    """
+    global _client # pylint: disable=W0603
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT,
+                connect=HTTP_CONNECT_TIMEOUT,
+                pool=HTTP_POOL_TIMEOUT,
+            ),
+            event_hooks={"request": [_on_request]},
+        )
+    return _client
+
+async def close_http_client():
+    """Closes the shared HTTP client and its connection pool."""
+    global _client # pylint: disable=W0603
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_http_stats() -> Dict[str, int]:
+    """
+    Returns connection reuse counters of the shared HTTP client.
+
+    Returns:
+        Dict[str, int]: Requests sent, connections opened, and requests
+        served over an already open connection.
+    """
+    return {
+        "requests": _stats["requests"],
+        "connections_opened": _stats["connections_opened"],
+        "connections_reused": max(_stats["requests"] - _stats["connections_opened"], 0),
+    }
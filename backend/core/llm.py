@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+import httpx
+from openai import AsyncOpenAI
+from core.cache import DatabaseCache, MemoryCache, RedisCache, TieredCache
+from core.metrics import (
+    LLM_REQUEST_DURATION, record_llm_usage, register_cache, tiered_cache_stats, track_duration
+)
+from core.tracing import span
+from messaging.redis import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHAT_MODEL = os.getenv("LLM_CHAT_MODEL", "gpt-4o")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+# Completion cache backend: memory, redis, postgres or none
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+
+# Conservative characters-per-token ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 3
+
+_client: Optional[AsyncOpenAI] = None
+
+def _build_completion_cache():
+    """Creates the completion cache for the configured LLM_CACHE_BACKEND."""
+    if LLM_CACHE_BACKEND == "none":
+        return None
+    memory = MemoryCache(maxsize=LLM_CACHE_SIZE)
+    if LLM_CACHE_BACKEND == "redis":
+        return TieredCache(
+            memory, RedisCache(AsyncRedisClient().redis, prefix="llm"), ttl=LLM_CACHE_TTL
+        )
+    if LLM_CACHE_BACKEND == "postgres":
+        return TieredCache(memory, DatabaseCache(prefix="llm"), ttl=LLM_CACHE_TTL)
+    return TieredCache(memory, ttl=LLM_CACHE_TTL)
+
+completion_cache = _build_completion_cache()
+if completion_cache is not None:
+    register_cache("llm_completions", tiered_cache_stats(completion_cache))
+
+def get_llm_client() -> AsyncOpenAI:
+    """
+    Returns the process-wide AsyncOpenAI client, creating it on first use.
+
+    All pipeline steps share this client so that its pooled HTTP connections
+    are reused across concurrent hypotheses instead of opened per call.
+    """
+    global _client # pylint: disable=W0603
+    if _client is None:
+        _client = AsyncOpenAI(
+            max_retries=LLM_MAX_RETRIES,
+            timeout=LLM_TIMEOUT,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=LLM_TIMEOUT,
+            ),
+        )
+    return _client
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in a text without calling a tokenizer.
+
+    The estimate errs on the high side so that budgets derived from it
+    stay within the model limits.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+async def close_llm_client():
+    """Closes the shared LLM client and its connection pool."""
+    global _client # pylint: disable=W0603
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+async def chat_completion(
+    messages: List[Dict[str, str]],
+    model: str = DEFAULT_CHAT_MODEL,
+    cache: Optional[bool] = None,
+    cache_ttl: Optional[int] = None,
+    **params: Any
+) -> str:
+    """
+    Sends a chat completion request without blocking the event loop.
+
+    Deterministic requests (temperature 0) are answered from the completion
+    cache when the same model, messages and parameters were sent before.
+
+    Args:
+        messages (List[Dict[str, str]]): The chat messages to send.
+        model (str): The chat model to use.
+        cache (Optional[bool]): Force caching on or off. By default only
+            temperature-0 requests are cached.
+        cache_ttl (Optional[int]): Seconds to keep the completion cached.
+            Defaults to LLM_CACHE_TTL.
+        **params: Additional completion parameters (e.g. temperature).
+
+    Returns:
+        str: The content of the first completion choice.
+    """
+    if cache is None:
+        cache = params.get("temperature") == 0
+    use_cache = cache and completion_cache is not None
+
+    if use_cache:
+        key = _completion_cache_key(model, messages, params)
+        content = await completion_cache.get(key)
+        if content is not None:
+            logger.debug("LLM completion cache hit (%s)", model)
+            return content
+
+    with span("llm.chat", {"llm.model": model}) as active, \
+            track_duration(LLM_REQUEST_DURATION, model=model, operation="chat"):
+        response = await get_llm_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            **params
+        )
+        if response.usage is not None:
+            record_llm_usage(model, response.usage.prompt_tokens, response.usage.completion_tokens)
+            if active is not None:
+                active.set_attribute("llm.prompt_tokens", response.usage.prompt_tokens)
+                active.set_attribute("llm.completion_tokens", response.usage.completion_tokens)
+    content = response.choices[0].message.content
+
+    if use_cache and content is not None:
+        await completion_cache.set(key, content, cache_ttl)
+    return content
+
+def _completion_cache_key(model: str, messages: List[Dict[str, str]], params: Dict) -> str:
+    """Hashes everything that determines a completion into a cache key."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def create_embeddings(inputs: List[str], model: str) -> List[List[float]]:
+    """
+    Requests embeddings for the given inputs without blocking the event loop.
+
+    Args:
+        inputs (List[str]): The texts to embed.
+        model (str): The embedding model to use.
+
+    Returns:
+        List[List[float]]: One embedding vector per input, in input order.
+    """
+    with span("llm.embeddings", {"llm.model": model, "llm.inputs": len(inputs)}) as active, \
+            track_duration(LLM_REQUEST_DURATION, model=model, operation="embeddings"):
+        response = await get_llm_client().embeddings.create(model=model, input=inputs)
+        if response.usage is not None:
+            record_llm_usage(model, response.usage.prompt_tokens)
+            if active is not None:
+                active.set_attribute("llm.prompt_tokens", response.usage.prompt_tokens)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
@@ -0,0 +1,149 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily
+from core.http import get_http_stats
+
+# Buckets from 50ms up to 10 minutes, covering single API calls and whole pipelines
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# USD per million tokens as (prompt, completion)
+LLM_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-ada-002": (0.10, 0.0),
+}
+
+PIPELINE_STEP_DURATION = Histogram(
+    "pipeline_step_duration_seconds",
+    "Duration of pipeline steps.",
+    ["pipeline", "step", "outcome"],
+    buckets=DURATION_BUCKETS,
+)
+PIPELINE_RUN_DURATION = Histogram(
+    "pipeline_run_duration_seconds",
+    "Duration of whole pipeline runs by final hypothesis status.",
+    ["pipeline", "status"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Duration of LLM API requests.",
+    ["model", "operation", "outcome"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens",
+    "Tokens processed by LLM API requests.",
+    ["model", "kind"],
+)
+LLM_COST = Counter(
+    "llm_cost_usd",
+    "Estimated cost of LLM API requests in USD.",
+    ["model"],
+)
+EXTERNAL_REQUEST_DURATION = Histogram(
+    "external_request_duration_seconds",
+    "Duration of requests to external APIs such as CORE and Wikipedia.",
+    ["service", "outcome"],
+    buckets=DURATION_BUCKETS,
+)
+EXTERNAL_REQUESTS = Counter(
+    "external_requests",
+    "Responses from external APIs by HTTP status.",
+    ["service", "status"],
+)
+PIPELINE_QUEUE_DEPTH = Gauge(
+    "pipeline_queue_depth",
+    "Validations waiting in the pipeline queue.",
+    ["priority"],
+)
+PIPELINE_RUNNING = Gauge(
+    "pipeline_running",
+    "Validations currently running across all workers.",
+)
+
+@contextmanager
+def track_duration(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """
+    Observes the duration of the enclosed block in a histogram with an
+    "outcome" label of "success" or "error".
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        histogram.labels(**labels, outcome=outcome).observe(time.perf_counter() - started)
+
+def record_llm_usage(model: str, prompt_tokens: int, completion_tokens: int = 0):
+    """Counts the tokens of an LLM request and their estimated cost."""
+    LLM_TOKENS.labels(model=model, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model=model, kind="completion").inc(completion_tokens)
+
+    # Dated snapshots such as gpt-4o-2024-08-06 are priced like their base model
+    prices = LLM_PRICES.get(model) or next(
+        (price for name, price in LLM_PRICES.items() if model.startswith(f"{name}-")), None
+    )
+    if prices is not None:
+        LLM_COST.labels(model=model).inc(
+            (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+        )
+
+# Cache statistics are kept by the caches themselves and read at scrape time
+CacheStats = Callable[[], List[Tuple[str, int, int]]]
+_caches: Dict[str, CacheStats] = {}
+
+def register_cache(name: str, stats: CacheStats):
+    """
+    Exposes the hit and miss counters of a cache.
+
+    Args:
+        name (str): The cache name used as metric label.
+        stats (CacheStats): Returns (tier, hits, misses) for each cache tier,
+            fastest first.
+    """
+    _caches[name] = stats
+
+def tiered_cache_stats(cache) -> CacheStats:
+    """Returns a stats function for a TieredCache or a single cache tier."""
+    tiers = getattr(cache, "tiers", (cache,))
+    return lambda: [(type(tier).__name__, tier.hits, tier.misses) for tier in tiers]
+
+class _StatsCollector:
+    """Collects counters kept outside prometheus_client when metrics are scraped."""
+
+    def collect(self):
+        """Yields the cache hit and miss counters and the outbound HTTP client counters."""
+        hits = CounterMetricFamily("cache_hits", "Cache lookups answered.",
+                                   labels=["cache", "tier"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups not answered.",
+                                     labels=["cache", "tier"])
+        for name, stats in _caches.items():
+            for tier, tier_hits, tier_misses in stats():
+                hits.add_metric([name, tier], tier_hits)
+                misses.add_metric([name, tier], tier_misses)
+        yield hits
+        yield misses
+
+        http_stats = get_http_stats()
+        yield CounterMetricFamily("http_client_requests", "Outbound HTTP requests sent.",
+                                  value=http_stats["requests"])
+        yield CounterMetricFamily("http_client_connections_opened",
+                                  "Outbound HTTP connections opened.",
+                                  value=http_stats["connections_opened"])
+
+_collector: Optional[_StatsCollector] = None
+
+def _register_collector():
+    global _collector # pylint: disable=W0603
+    if _collector is None:
+        _collector = _StatsCollector()
+        REGISTRY.register(_collector)
+
+_register_collector()
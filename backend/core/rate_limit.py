@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Optional
+import dateutil.parser
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Atomically refills and takes one token from a bucket shared by all workers.
+# Returns "0" when a token was taken, or the seconds to wait for the next one.
+_TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+if tokens == nil or updated == nil then
+    tokens = capacity
+    updated = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+class TokenBucket: # pylint: disable=R0902
+    """
+    An asyncio token-bucket rate limiter for an external API.
+
+    Callers queue on a lock and are served in arrival order, so a burst of
+    pipelines is spread out instead of stampeding the API. When a Redis
+    client is given, the bucket and any cooldown are shared by all workers.
+
+    Attributes:
+        name (str): Name of the limited API, used in Redis keys and logs.
+        rate (float): Tokens added per second.
+        capacity (int): Maximum burst size.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            rate: float,
+            capacity: int,
+            redis: Optional[Redis] = None
+    ):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._redis = redis
+        self._script = redis.register_script(_TAKE_TOKEN_SCRIPT) if redis else None
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a request may be sent, honouring any active cooldown."""
+        async with self._lock:
+            await self._wait_for_cooldown()
+            while True:
+                wait = await self._take_token()
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    async def pause_until(self, resume_at: float):
+        """
+        Stops handing out tokens until the given epoch time, e.g. after the
+        API responded with 429.
+        """
+        self._resume_at = max(self._resume_at, resume_at)
+        if self._redis is None:
+            return
+        try:
+            delay_ms = int((resume_at - time.time()) * 1000)
+            if delay_ms > 0:
+                await self._redis.set(
+                    f"ratelimit:{self.name}:resume_at", str(resume_at), px=delay_ms
+                )
+        except RedisError as e:
+            logger.warning("Could not share %s cooldown via Redis: %s", self.name, e)
+
+    async def _wait_for_cooldown(self):
+        resume_at = self._resume_at
+        if self._redis is not None:
+            try:
+                shared = await self._redis.get(f"ratelimit:{self.name}:resume_at")
+                if shared:
+                    resume_at = max(resume_at, float(shared))
+            except RedisError as e:
+                logger.warning("Could not read %s cooldown from Redis: %s", self.name, e)
+
+        delay = resume_at - time.time()
+        if delay > 0:
+            logger.info("[%s] Rate limited, waiting %.1fs", self.name, delay)
+            await asyncio.sleep(delay)
+
+    async def _take_token(self) -> float:
+        if self._script is not None:
+            try:
+                wait = await self._script(
+                    keys=[f"ratelimit:{self.name}:bucket"],
+                    args=[self.rate, self.capacity, time.time()]
+                )
+                return float(wait)
+            except RedisError as e:
+                logger.warning("Falling back to local %s rate limiter: %s", self.name, e)
+
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Computes an exponential backoff delay with full jitter.
+
+    Args:
+        attempt (int): The zero-based retry attempt.
+        base (float): The delay ceiling of the first attempt, in seconds.
+        cap (float): The maximum delay ceiling, in seconds.
+
+    Returns:
+        float: A random delay between 0 and min(cap, base * 2 ** attempt).
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After style header given either in seconds or as a date.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_time = dateutil.parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+    if retry_time.tzinfo is None:
+        retry_time = retry_time.replace(tzinfo=timezone.utc)
+    return max((retry_time - datetime.now(timezone.utc)).total_seconds(), 0.0)
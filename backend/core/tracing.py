@@ -0,0 +1,344 @@
+"""
+Lightweight tracing with OpenTelemetry-compatible spans.
+
+Spans nest through a context variable, so spans started in tasks created
+within a span become its children. Every span inherits the "hypothesis.id"
+attribute of its parent, so all spans of one validation can be selected by
+hypothesis ID. Finished spans are exported in batches from a background
+thread, either as JSON lines to a file or as OTLP/JSON to a collector.
+"""
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
+import httpx
+from fastapi import Request
+from starlette.routing import Match
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()  # none, file, otlp
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "skagen-backend")
+TRACING_BATCH_SIZE = int(os.getenv("TRACING_BATCH_SIZE", "256"))
+TRACING_EXPORT_INTERVAL = float(os.getenv("TRACING_EXPORT_INTERVAL", "5"))  # seconds
+
+# Attributes copied from a parent span to its children
+INHERITED_ATTRIBUTES = ("hypothesis.id",)
+
+@dataclass
+class Span: # pylint: disable=R0902
+    """
+    A timed operation within a trace.
+
+    Attributes:
+        name (str): The operation name, e.g. "llm.chat" or "GET /claims".
+        trace_id (str): 32 hex digits shared by all spans of a trace.
+        span_id (str): 16 hex digits identifying the span.
+        parent_id (Optional[str]): The span ID of the parent span.
+        start_ns (int): Start time in nanoseconds since the epoch.
+        end_ns (Optional[int]): End time in nanoseconds since the epoch.
+        attributes (Dict[str, Any]): Attributes describing the operation.
+        error (Optional[str]): The error that ended the span, if any.
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        """Sets an attribute of the span."""
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        """The W3C traceparent header value that continues this trace."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the span as a JSON-serialisable dict."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class SpanExporter(Protocol):
+    """Receives batches of finished spans."""
+
+    def export(self, spans: List[Span]):
+        """Exports finished spans."""
+
+class FileSpanExporter:
+    """Appends spans as JSON lines to a local file."""
+
+    def __init__(self, path: str = TRACING_FILE):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        """Appends the spans to the file."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            for finished in spans:
+                f.write(json.dumps(finished.to_dict(), default=str) + "\n")
+
+class OTLPSpanExporter:
+    """Posts spans in the OTLP/JSON format to a collector's HTTP endpoint."""
+
+    def __init__(
+            self,
+            endpoint: str = TRACING_OTLP_ENDPOINT,
+            service_name: str = TRACING_SERVICE_NAME
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=10)
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _span(self, finished: Span) -> Dict[str, Any]:
+        data = {
+            "traceId": finished.trace_id,
+            "spanId": finished.span_id,
+            "name": finished.name,
+            "kind": 1,
+            "startTimeUnixNano": str(finished.start_ns),
+            "endTimeUnixNano": str(finished.end_ns),
+            "attributes": [
+                {"key": key, "value": self._value(value)}
+                for key, value in finished.attributes.items()
+            ],
+            "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1},
+        }
+        if finished.parent_id:
+            data["parentSpanId"] = finished.parent_id
+        return data
+
+    def export(self, spans: List[Span]):
+        """Posts the spans to the collector."""
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}}
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "core.tracing"},
+                "spans": [self._span(finished) for finished in spans],
+            }],
+        }]}
+        response = self._client.post(self.endpoint, json=payload)
+        response.raise_for_status()
+
+class _BatchProcessor:
+    """Exports finished spans in batches from a daemon thread."""
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def add(self, finished: Span):
+        """Queues a finished span for the next batch."""
+        self._queue.put(finished)
+
+    def _export(self, batch: List[Span]):
+        try:
+            self.exporter.export(batch)
+        except Exception as e: # pylint: disable=broad-except
+            logger.warning("Failed to export %d spans: %s", len(batch), e)
+
+    def _run(self):
+        batch: List[Span] = []
+        deadline = time.monotonic() + TRACING_EXPORT_INTERVAL
+        stopping = False
+        while not stopping:
+            try:
+                finished = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                if finished is None:
+                    stopping = True
+                else:
+                    batch.append(finished)
+            except queue.Empty:
+                pass
+
+            if stopping or len(batch) >= TRACING_BATCH_SIZE or time.monotonic() >= deadline:
+                if batch:
+                    self._export(batch)
+                    batch = []
+                deadline = time.monotonic() + TRACING_EXPORT_INTERVAL
+
+    def shutdown(self):
+        """Exports the remaining spans and stops the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=TRACING_EXPORT_INTERVAL * 2)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_processor: Optional[_BatchProcessor] = None
+
+def configure_tracing(exporter: Optional[SpanExporter] = None):
+    """
+    Enables tracing with the given exporter, or with the one selected by
+    TRACING_EXPORTER, and traces database commits.
+    """
+    global _processor # pylint: disable=W0603
+    if exporter is None:
+        if TRACING_EXPORTER == "file":
+            exporter = FileSpanExporter()
+        elif TRACING_EXPORTER == "otlp":
+            exporter = OTLPSpanExporter()
+        else:
+            return
+
+    shutdown_tracing()
+    _processor = _BatchProcessor(exporter)
+    if not event.contains(Session, "before_commit", _before_commit):
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_commit)
+
+def shutdown_tracing():
+    """Exports the remaining spans and disables tracing."""
+    global _processor # pylint: disable=W0603
+    if _processor is not None:
+        _processor.shutdown()
+        _processor = None
+
+def current_span() -> Optional[Span]:
+    """Returns the innermost active span, if any."""
+    return _current_span.get()
+
+def current_traceparent() -> Optional[str]:
+    """Returns the traceparent of the active span, to continue its trace elsewhere."""
+    active = _current_span.get()
+    return active.traceparent if active is not None else None
+
+def _parse_traceparent(traceparent: Optional[str]) -> Optional[Span]:
+    """Returns a stand-in parent span for a W3C traceparent value."""
+    parts = (traceparent or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return Span(name="remote", trace_id=parts[1], span_id=parts[2])
+
+def _new_span(name: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Span:
+    inherited = {
+        key: parent.attributes[key]
+        for key in INHERITED_ATTRIBUTES
+        if parent is not None and key in parent.attributes
+    }
+    return Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent is not None else None,
+        attributes={**inherited, **attributes},
+    )
+
+def _finish(finished: Span):
+    finished.end_ns = time.time_ns()
+    if _processor is not None:
+        _processor.add(finished)
+
+@contextmanager
+def span(
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None
+) -> Iterator[Optional[Span]]:
+    """
+    Records the enclosed block as a span, child of the active span.
+
+    Args:
+        name (str): The span name.
+        attributes (Optional[Dict[str, Any]]): Attributes of the span.
+        traceparent (Optional[str]): Continues a trace started in another
+            process instead of the active span's trace.
+
+    Yields:
+        Optional[Span]: The active span, or None when tracing is disabled.
+    """
+    if _processor is None:
+        yield None
+        return
+
+    parent = _parse_traceparent(traceparent) or _current_span.get()
+    active = _new_span(name, parent, attributes or {})
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(active)
+
+def _before_commit(session: Session):
+    if _processor is not None:
+        session.info["commit_span"] = _new_span("db.commit", _current_span.get(), {})
+
+def _after_commit(session: Session):
+    pending = session.info.pop("commit_span", None)
+    if pending is not None:
+        _finish(pending)
+
+def _match_route(request: Request) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns the path template and path parameters of the route a request
+    will be routed to, or its path and no parameters if none matches.
+    """
+    for route in request.app.router.routes:
+        match, child_scope = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path), child_scope.get("path_params", {})
+    return request.url.path, {}
+
+async def trace_requests(request: Request, call_next):
+    """
+    FastAPI middleware that records each request as a span, continuing the
+    trace of an incoming traceparent header.
+
+    The route is matched up front, since path parameters are only set once
+    the request is routed, so that the spans of the request's handler
+    inherit the "hypothesis.id" of the route.
+    """
+    path, path_params = _match_route(request)
+    attributes = {"http.method": request.method, "http.target": request.url.path}
+    if "hypothesis_id" in path_params:
+        attributes["hypothesis.id"] = path_params["hypothesis_id"]
+
+    with span(
+        f"{request.method} {path}",
+        attributes,
+        traceparent=request.headers.get("traceparent"),
+    ) as active:
+        response = await call_next(request)
+        if active is not None:
+            active.set_attribute("http.status_code", response.status_code)
+        return response
@@ -4,14 +4,15 @@ import re
 import logging
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy_pagination import paginate
 from schemas import academic_works as work_schemas
 from db import models
+from db.database import dialect_insert
 from core import utils
-from openai import OpenAI, OpenAIError
+from core.llm import chat_completion
+from openai import OpenAIError
 
-client = OpenAI()
 logger = logging.getLogger(__name__)
 
 async def create_academic_work(
@@ -22,10 +23,69 @@ async def create_academic_work(
     Adds a single academic work to the database.
     Skips if the record already exists.
     """
-    work_id = utils.generate_id('W')
-    core_id = work.core_id
+    db_work = models.AcademicWork(**_prepare_work_values(work))
+    try:
+        db.add(db_work)
+        db.commit()
+        db.refresh(db_work)
+    except IntegrityError:
+        db.rollback()  # Skip duplicates
+        db_work = db.query(models.AcademicWork).filter(
+            models.AcademicWork.core_id == work.core_id
+        ).first()
+    return db_work
+
+def bulk_upsert_academic_works(
+        db: Session,
+        works: List[work_schemas.AcademicWorkCreate]
+) -> List[models.AcademicWork]:
+    """
+    Adds several academic works to the database in a single statement.
+    Existing records (matched on core_id) are left unchanged and returned.
+
+    Args:
+        db (Session): Database session.
+        works (List[AcademicWorkCreate]): The works to ingest.
+
+    Returns:
+        List[AcademicWork]: The stored works, in input order, one per distinct core_id.
+    """
+    values_by_core_id = {}
+    for work in works:
+        if work.core_id not in values_by_core_id:
+            values_by_core_id[work.core_id] = _prepare_work_values(work)
+
+    if not values_by_core_id:
+        return []
+
+    stmt = dialect_insert(db, models.AcademicWork).values(list(values_by_core_id.values()))
+    # A no-op update (instead of DO NOTHING) makes RETURNING include existing rows
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["core_id"],
+        set_={"core_id": stmt.excluded.core_id}
+    ).returning(models.AcademicWork)
+
+    try:
+        db_works = db.scalars(
+            stmt, execution_options={"populate_existing": True}
+        ).all()
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+
+    works_by_core_id = {db_work.core_id: db_work for db_work in db_works}
+    return [
+        works_by_core_id[core_id]
+        for core_id in values_by_core_id
+        if core_id in works_by_core_id
+    ]
+
+def _prepare_work_values(work: work_schemas.AcademicWorkCreate) -> dict:
+    """
+    Normalises an academic work into the column values of a new record.
+    """
     title = _remove_null_bytes(work.title)
-    abstract = _remove_null_bytes(work.abstract)
     authors = [{"name": getattr(author, "name", author)} for author in work.authors]
     authors_formatted = _format_authors(authors)
     links = [
@@ -39,32 +99,21 @@ async def create_academic_work(
     publisher = _remove_null_bytes(work.publisher)
     pub_str = f"{publisher}." if publisher else ""
     apa_citation = f"{authors_formatted} ({year_published}). {title}. {pub_str}".strip()
-    full_text = _remove_null_bytes(work.full_text)
-
-    db_work = models.AcademicWork(
-        id = work_id,
-        abstract = abstract,
-        apa_citation = apa_citation,
-        authors = authors,
-        authors_formatted = authors_formatted,
-        links = links,
-        core_id = core_id,
-        full_text = full_text,
-        published_date = work.published_date,
-        publisher = publisher,
-        title = title,
-        year_published = year_published
-    )
-    try:
-        db.add(db_work)
-        db.commit()
-        db.refresh(db_work)
-    except IntegrityError:
-        db.rollback()  # Skip duplicates
-        db_work = db.query(models.AcademicWork).filter(
-            models.AcademicWork.core_id == core_id
-        ).first()
-    return db_work
+
+    return {
+        "id": utils.generate_id('W'),
+        "abstract": _remove_null_bytes(work.abstract),
+        "apa_citation": apa_citation,
+        "authors": authors,
+        "authors_formatted": authors_formatted,
+        "links": links,
+        "core_id": work.core_id,
+        "full_text": _remove_null_bytes(work.full_text),
+        "published_date": work.published_date,
+        "publisher": publisher,
+        "title": title,
+        "year_published": year_published,
+    }
 
 def get_all_academic_works(db: Session, page: int, per_page: int) -> dict:
     """
@@ -96,6 +145,23 @@ def get_academic_work_by_id(db: Session, academic_work_id: str) -> Optional[mode
         models.AcademicWork.id == academic_work_id
     ).first()
 
+def get_academic_works_by_core_ids(
+        db: Session,
+        core_ids: List[str]
+) -> List[models.AcademicWork]:
+    """
+    Fetches academic works by their CORE ids in one query, in the given order.
+    Unknown ids are skipped.
+    """
+    if not core_ids:
+        return []
+
+    works = db.query(models.AcademicWork).filter(
+        models.AcademicWork.core_id.in_(core_ids)
+    ).all()
+    works_by_core_id = {work.core_id: work for work in works}
+    return [works_by_core_id[core_id] for core_id in core_ids if core_id in works_by_core_id]
+
 def update_academic_work(
         db: Session,
         academic_work_id: str,
@@ -157,8 +223,8 @@ async def _perform_llm_summerization(text: str) -> dict:
     text = _truncate_text(text, 5000)
 
     try:
-        response = await _retry_request(
-            client.chat.completions.create,
+        return await _retry_request(
+            chat_completion,
             model="gpt-4o",
             messages=[
                 {
@@ -174,7 +240,6 @@ async def _perform_llm_summerization(text: str) -> dict:
                 {"role": "user", "content": text},
             ],
         )
-        return response.choices[0].message.content
     except OpenAIError as e:
         logger.error("Error during LLM summarization: %s", e)
         return "Summarization failed."
@@ -182,7 +247,7 @@ async def _perform_llm_summerization(text: str) -> dict:
 async def _retry_request(func, *args, max_retries=5, backoff_factor=1.5, **kwargs):
     for i in range(max_retries):
         try:
-            return await asyncio.to_thread(func, *args, **kwargs)
+            return await func(*args, **kwargs)
         except OpenAIError:
             if i == max_retries - 1:
                 raise
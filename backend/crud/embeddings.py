@@ -0,0 +1,61 @@
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from db import models
+from db.database import dialect_insert
+
+def get_embeddings(
+        db: Session,
+        model: str,
+        text_hashes: List[str]
+) -> Dict[str, models.Embedding]:
+    """
+    Fetches the stored embeddings for the given text hashes in one query.
+
+    Args:
+        db (Session): Database session.
+        model (str): The embedding model name.
+        text_hashes (List[str]): The content hashes to look up.
+
+    Returns:
+        Dict[str, Embedding]: The stored embeddings keyed by text hash.
+    """
+    if not text_hashes:
+        return {}
+
+    embeddings = db.query(models.Embedding).filter(
+        models.Embedding.model == model,
+        models.Embedding.text_hash.in_(text_hashes)
+    ).all()
+    return {embedding.text_hash: embedding for embedding in embeddings}
+
+def create_embeddings(
+        db: Session,
+        model: str,
+        vectors: Dict[str, bytes],
+        dimensions: int
+) -> None:
+    """
+    Stores embeddings keyed by text hash in a single statement.
+    Skips hashes that are already stored.
+
+    Args:
+        db (Session): Database session.
+        model (str): The embedding model name.
+        vectors (Dict[str, bytes]): Serialized float32 vectors keyed by text hash.
+        dimensions (int): The dimensionality of the vectors.
+    """
+    if not vectors:
+        return
+
+    stmt = dialect_insert(db, models.Embedding).values([
+        {
+            "model": model,
+            "text_hash": text_hash,
+            "dimensions": dimensions,
+            "vector": vector,
+        }
+        for text_hash, vector in vectors.items()
+    ]).on_conflict_do_nothing(index_elements=["model", "text_hash"])
+
+    db.execute(stmt)
+    db.commit()
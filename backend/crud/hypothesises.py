@@ -1,3 +1,6 @@
+import hashlib
+import re
+import unicodedata
 from typing import List, Optional, Tuple
 from fastapi import HTTPException
 from sqlalchemy import asc, desc
@@ -7,6 +10,16 @@ from schemas import hypothesises as hypothesis_schemas
 from db import models
 from core import utils
 
+def hypothesis_content_hash(content: str) -> str:
+    """
+    Hashes hypothesis content after normalising case, Unicode form,
+    whitespace and trailing punctuation, so that trivially different
+    phrasings of the same claim share a hash.
+    """
+    normalized = unicodedata.normalize("NFKC", content).casefold()
+    normalized = re.sub(r"\s+", " ", normalized).strip().rstrip(".!?").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
 def create_hypothesis(
     db: Session,
     hypothesis: hypothesis_schemas.HypothesisCreate,
@@ -21,6 +34,7 @@ def create_hypothesis(
         user_id=current_user.id,
         parent_id=None,
         content=hypothesis.content,
+        content_hash=hypothesis_content_hash(hypothesis.content),
         extracted_topics=[],
         extracted_terms=[],
         query_type='unknown'
@@ -50,6 +64,8 @@ def update_hypothesis(
     update_data = hypothesis_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_hypothesis, key, value)
+    if is_content_updated:
+        db_hypothesis.content_hash = hypothesis_content_hash(db_hypothesis.content)
 
     db.commit()
     db.refresh(db_hypothesis)
@@ -0,0 +1,118 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from db import models
+from db.database import dialect_insert
+from core import utils
+
+# Seconds without a heartbeat after which a running run is considered abandoned
+PIPELINE_RUN_STALE_AFTER = int(os.getenv("PIPELINE_RUN_STALE_AFTER", "120"))
+
+def claim_resumable_run(
+        db: Session,
+        hypothesis_id: str,
+        content_hash: Optional[str],
+        stale_after: int = PIPELINE_RUN_STALE_AFTER
+) -> Optional[models.PipelineRun]:
+    """
+    Claims the latest run of a hypothesis that did not finish, provided the
+    hypothesis content has not changed since.
+
+    A failed run can be resumed at once. A run that is still "Running" is
+    only resumed once its heartbeat is older than `stale_after` seconds,
+    i.e. its worker is gone. The run is claimed with a conditional update,
+    so of several workers trying to resume it, only one succeeds.
+
+    Args:
+        db (Session): Database session.
+        hypothesis_id (str): The hypothesis ID.
+        content_hash (Optional[str]): The current content hash of the hypothesis.
+        stale_after (int): Seconds after which a running run is abandoned.
+
+    Returns:
+        Optional[PipelineRun]: The claimed run to resume, or None.
+    """
+    latest = db.query(models.PipelineRun) \
+        .filter(models.PipelineRun.hypothesis_id == hypothesis_id) \
+        .order_by(models.PipelineRun.date_created.desc(), models.PipelineRun.id.desc()) \
+        .first()
+    if latest is None or latest.content_hash != content_hash:
+        return None
+
+    now = datetime.now(timezone.utc)
+    claimed = db.query(models.PipelineRun).filter(
+        models.PipelineRun.id == latest.id,
+        or_(
+            models.PipelineRun.status == "Failed",
+            and_(
+                models.PipelineRun.status == "Running",
+                or_(
+                    models.PipelineRun.heartbeat_at.is_(None),
+                    models.PipelineRun.heartbeat_at < now - timedelta(seconds=stale_after)
+                )
+            )
+        )
+    ).update({"status": "Running", "heartbeat_at": now}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        return None
+
+    db.refresh(latest)
+    return latest
+
+def heartbeat_run(db: Session, pipeline_run_id: str) -> None:
+    """
+    Records that the worker executing a run is still alive.
+    """
+    db.query(models.PipelineRun).filter(
+        models.PipelineRun.id == pipeline_run_id,
+        models.PipelineRun.status == "Running"
+    ).update({"heartbeat_at": datetime.now(timezone.utc)}, synchronize_session=False)
+    db.commit()
+
+def create_run(db: Session, hypothesis: models.Hypothesis) -> models.PipelineRun:
+    """
+    Starts a new pipeline run for a hypothesis.
+    """
+    pipeline_run = models.PipelineRun(
+        id=utils.generate_id('R'),
+        hypothesis_id=hypothesis.id,
+        content_hash=hypothesis.content_hash,
+        status="Running",
+        heartbeat_at=datetime.now(timezone.utc)
+    )
+    db.add(pipeline_run)
+    db.commit()
+    db.refresh(pipeline_run)
+    return pipeline_run
+
+def get_step_results(db: Session, pipeline_run_id: str) -> Dict[str, Any]:
+    """
+    Fetches the results of the completed steps of a run, keyed by step output name.
+    """
+    step_results = db.query(models.StepResult) \
+        .filter(models.StepResult.pipeline_run_id == pipeline_run_id).all()
+    return {step_result.name: step_result.result for step_result in step_results}
+
+def save_step_result(db: Session, pipeline_run_id: str, name: str, result: Any) -> None:
+    """
+    Stores the result of a completed step, replacing an earlier result of the same step.
+    """
+    stmt = dialect_insert(db, models.StepResult).values(
+        pipeline_run_id=pipeline_run_id, name=name, result=result
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["pipeline_run_id", "name"],
+        set_={"result": stmt.excluded.result}
+    )
+    db.execute(stmt)
+    db.commit()
+
+def finish_run(db: Session, pipeline_run: models.PipelineRun, status: str) -> None:
+    """
+    Records the final status of a run.
+    """
+    pipeline_run.status = status
+    db.commit()
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from db import models
+from db.database import dialect_insert
+
+def get_wikipedia_articles(db: Session, titles: List[str]) -> Dict[str, models.WikipediaArticle]:
+    """
+    Fetches the cached articles with the given titles in one query.
+
+    Args:
+        db (Session): Database session.
+        titles (List[str]): The article titles to look up.
+
+    Returns:
+        Dict[str, WikipediaArticle]: The cached articles keyed by title.
+    """
+    if not titles:
+        return {}
+
+    articles = db.query(models.WikipediaArticle).filter(
+        models.WikipediaArticle.title.in_(titles)
+    ).all()
+    return {article.title: article for article in articles}
+
+def upsert_wikipedia_articles(db: Session, articles: List[Dict], fetched_at: datetime) -> None:
+    """
+    Stores freshly downloaded articles, replacing older revisions.
+
+    Args:
+        db (Session): Database session.
+        articles (List[Dict]): Articles with "title", "page_id", "summary",
+            "url", "text" and "revision_id".
+        fetched_at (datetime): The time the articles were downloaded.
+    """
+    if not articles:
+        return
+
+    stmt = dialect_insert(db, models.WikipediaArticle).values([
+        {
+            "title": article["title"],
+            "page_id": article["page_id"],
+            "summary": article["summary"],
+            "url": article["url"],
+            "text": article["text"],
+            "revision_id": article["revision_id"],
+            "date_fetched": fetched_at,
+            "date_verified": fetched_at,
+            "last_accessed": fetched_at,
+        }
+        for article in articles
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["title"],
+        set_={
+            column: stmt.excluded[column]
+            for column in ("page_id", "summary", "url", "text", "revision_id",
+                           "date_fetched", "date_verified", "last_accessed")
+        }
+    )
+
+    db.execute(stmt)
+    db.commit()
+
+def touch_wikipedia_articles(
+        db: Session,
+        titles: List[str],
+        accessed_at: datetime,
+        verified: bool = False
+) -> None:
+    """
+    Records that cached articles were served, and optionally that their
+    revision was confirmed to still be current.
+    """
+    if not titles:
+        return
+
+    values = {"last_accessed": accessed_at}
+    if verified:
+        values["date_verified"] = accessed_at
+
+    db.execute(
+        update(models.WikipediaArticle)
+        .where(models.WikipediaArticle.title.in_(titles))
+        .values(**values)
+    )
+    db.commit()
+
+def evict_wikipedia_articles(db: Session, max_articles: int) -> int:
+    """
+    Deletes the least recently accessed articles beyond the cache size limit.
+
+    Returns:
+        int: The number of evicted articles.
+    """
+    stale_titles = db.query(models.WikipediaArticle.title).order_by(
+        models.WikipediaArticle.last_accessed.desc()
+    ).offset(max_articles).all()
+    if not stale_titles:
+        return 0
+
+    evicted = db.query(models.WikipediaArticle).filter(
+        models.WikipediaArticle.title.in_([row.title for row in stale_titles])
+    ).delete(synchronize_session=False)
+    db.commit()
+    return evicted
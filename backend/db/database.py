@@ -1,6 +1,7 @@
 import os
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 import dotenv
 
 # PostgreSQL database connection URL
@@ -21,3 +22,17 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def dialect_insert(db: Session, model):
+    """
+    Returns an INSERT construct for the session's database dialect.
+
+    The PostgreSQL and SQLite constructs support ON CONFLICT clauses, which
+    plain SQLAlchemy inserts do not.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upserts are not supported for dialect '{dialect}'.")
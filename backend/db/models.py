@@ -1,4 +1,6 @@
-from sqlalchemy import JSON, Column, ForeignKey, String, DateTime, UniqueConstraint
+from sqlalchemy import (
+    JSON, Column, ForeignKey, Integer, LargeBinary, String, Text, DateTime, UniqueConstraint
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -28,6 +30,7 @@ class Hypothesis(Base):
     parent = relationship("Hypothesis", remote_side=[id], backref="children")
 
     content = Column(String, nullable=False)
+    content_hash = Column(String, nullable=True, index=True)
     status = Column(String, default='Pending')
     extracted_topics = Column(JSON, nullable=False, default=[])
     extracted_terms = Column(JSON, nullable=False, default=[])
@@ -38,6 +41,9 @@ class Hypothesis(Base):
 
     validation_results = relationship("ValidationResult", back_populates="hypothesis")
     feedbacks = relationship("Feedback", back_populates="hypothesis")
+    pipeline_runs = relationship(
+        "PipelineRun", back_populates="hypothesis", cascade="all, delete-orphan"
+    )
 
 class ValidationResult(Base):
     __tablename__ = "validation_results"
@@ -79,6 +85,64 @@ class AcademicWork(Base):
         UniqueConstraint('core_id', name='uq_academicwork_core_id'),
     )
 
+class Embedding(Base):
+    __tablename__ = "embeddings"
+
+    model = Column(String, primary_key=True)
+    text_hash = Column(String, primary_key=True)
+    dimensions = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    date_created = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=E1102
+
+class CacheEntry(Base):
+    __tablename__ = "cache_entries"
+
+    key = Column(String, primary_key=True)
+    value = Column(JSON, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    date_created = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=E1102
+
+class WikipediaArticle(Base):
+    __tablename__ = "wikipedia_articles"
+
+    title = Column(String, primary_key=True)
+    page_id = Column(Integer, nullable=False)
+    summary = Column(Text, nullable=True)
+    url = Column(String, nullable=True)
+    text = Column(Text, nullable=True)
+    revision_id = Column(Integer, nullable=True)
+    date_fetched = Column(DateTime(timezone=True), nullable=False)
+    date_verified = Column(DateTime(timezone=True), nullable=False)
+    last_accessed = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class PipelineRun(Base):
+    __tablename__ = "pipeline_runs"
+
+    id = Column(String, primary_key=True, index=True)
+
+    hypothesis_id = Column(String, ForeignKey("hypothesises.id"), index=True, nullable=False)
+    hypothesis = relationship("Hypothesis", back_populates="pipeline_runs")
+
+    content_hash = Column(String, nullable=True)
+    status = Column(String, nullable=False, default='Running')
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    date_created = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=E1102
+    date_updated = Column(DateTime(timezone=True), onupdate=func.now()) # pylint: disable=E1102
+
+    step_results = relationship(
+        "StepResult", back_populates="pipeline_run", cascade="all, delete-orphan"
+    )
+
+class StepResult(Base):
+    __tablename__ = "step_results"
+
+    pipeline_run_id = Column(String, ForeignKey("pipeline_runs.id"), primary_key=True)
+    pipeline_run = relationship("PipelineRun", back_populates="step_results")
+
+    name = Column(String, primary_key=True)
+    result = Column(JSON, nullable=True)
+    date_created = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=E1102
+
 class Feedback(Base):
     __tablename__ = "hypothesis_feedback"
 
@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -8,20 +9,34 @@ from fastapi import FastAPI # pylint: disable=C0413
 from fastapi.staticfiles import StaticFiles # pylint: disable=C0413
 from core.logging import configure_logging # pylint: disable=C0413
 from core.config import setup_cors # pylint: disable=C0413
-from routers import users, auth, hypothesis, academic_works, sse # pylint: disable=C0413
+from core.http import close_http_client # pylint: disable=C0413
+from core.llm import close_llm_client # pylint: disable=C0413
+from core.tracing import configure_tracing, shutdown_tracing, trace_requests # pylint: disable=C0413
+from routers import users, auth, hypothesis, academic_works, sse, metrics # pylint: disable=C0413
 from db.database import Base, engine # pylint: disable=C0413
 
-# Configure logging
+# Configure logging and tracing
 configure_logging()
+configure_tracing()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Releases process-wide clients when the application shuts down."""
+    yield
+    await close_http_client()
+    await close_llm_client()
+    await sse.progress_hub.close()
+    shutdown_tracing()
 
 # Create FastAPI app instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
 # Initialize configurations
 setup_cors(app)
+app.middleware("http")(trace_requests)
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
@@ -29,6 +44,7 @@ app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(hypothesis.router, prefix="/claims", tags=["Claims (Hypotheses)"])
 app.include_router(academic_works.router, prefix="/works", tags=["Academic Works"])
 app.include_router(sse.router, prefix="/sse", tags=["SSE"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
 
 # Mount the static images directory at "/icons"
 static_icons_dir = os.path.join(os.path.dirname(__file__), "static", "icons")
@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PREFIX = "pipeline_updates"
+# Events kept per hypothesis for replay
+PROGRESS_STREAM_MAXLEN = int(os.getenv("PROGRESS_STREAM_MAXLEN", "200"))
+PROGRESS_STREAM_TTL = int(os.getenv("PROGRESS_STREAM_TTL", "86400"))  # seconds after the last event
+HUB_QUEUE_SIZE = int(os.getenv("HUB_QUEUE_SIZE", "100"))  # buffered events per subscriber
+HUB_RECONNECT_DELAY = 1.0  # seconds before reading again after a Redis error
+
+def progress_key(hypothesis_id: str) -> str:
+    """Returns the Redis channel and stream key of a hypothesis' progress events."""
+    return f"{PROGRESS_PREFIX}:{hypothesis_id}"
+
+def _id_order(event_id: str) -> Tuple[int, int]:
+    milliseconds, _, sequence = event_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+@dataclass
+class ProgressEvent:
+    """
+    A progress event of one hypothesis.
+
+    Attributes:
+        id (str): The event's Redis stream entry ID, in publishing order.
+        data (Dict[str, Any]): The decoded event.
+        raw (str): The event as published, to forward without re-encoding.
+    """
+    id: str
+    data: Dict[str, Any]
+    raw: str
+
+    @classmethod
+    def parse(cls, message: str) -> "ProgressEvent":
+        """
+        Parses a message published on a progress channel: the stream entry
+        ID, a space and the JSON event.
+
+        Raises:
+            ValueError: If the message is malformed.
+        """
+        event_id, _, raw = message.partition(" ")
+        _id_order(event_id)
+        return cls(id=event_id, data=json.loads(raw), raw=raw)
+
+async def publish_progress(redis: Redis, hypothesis_id: str, message: Dict[str, Any]) -> str:
+    """
+    Publishes a progress event of a hypothesis.
+
+    The event is appended to the hypothesis' stream, which keeps about the
+    last PROGRESS_STREAM_MAXLEN events for replay, and then published on the
+    hypothesis' channel for live subscribers.
+
+    Returns:
+        str: The event ID.
+    """
+    key = progress_key(hypothesis_id)
+    raw = json.dumps(message)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.xadd(key, {"data": raw}, maxlen=PROGRESS_STREAM_MAXLEN, approximate=True)
+        pipe.expire(key, PROGRESS_STREAM_TTL)
+        event_id, _ = await pipe.execute()
+    await redis.publish(key, f"{event_id} {raw}")
+    return event_id
+
+class ProgressHub:
+    """
+    Fans out pipeline progress events to in-process subscribers.
+
+    A single background task per process reads one Redis pub/sub connection
+    that is subscribed to the channels of the hypotheses with subscribers
+    only. Each event is decoded once and routed to the queues of its
+    hypothesis' subscribers. A subscriber that falls behind loses its oldest
+    buffered events rather than holding up the others.
+
+    Subscribers that reconnect pass the ID of the last event they received,
+    and first receive the events they missed from the hypothesis' stream.
+
+    Attributes:
+        queue_size (int): Events buffered per subscriber.
+    """
+
+    def __init__(self, redis: Redis, queue_size: int = HUB_QUEUE_SIZE):
+        self._redis = redis
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._active = asyncio.Event()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(
+            self,
+            hypothesis_id: str,
+            last_event_id: Optional[str] = None
+    ) -> AsyncIterator["asyncio.Queue[ProgressEvent]"]:
+        """
+        Subscribes to the events of one hypothesis for the duration of the
+        context, yielding the queue they are delivered to.
+
+        Args:
+            hypothesis_id (str): The hypothesis to receive events of.
+            last_event_id (Optional[str]): The last event ID the subscriber
+                received; the later events still in the stream are delivered
+                first. "0" replays the whole stream.
+        """
+        if self._pubsub is None:
+            self._pubsub = self._redis.pubsub()
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+        updates: "asyncio.Queue[ProgressEvent]" = asyncio.Queue(maxsize=self.queue_size)
+        subscribers = self._subscribers.setdefault(hypothesis_id, set())
+        subscribers.add(updates)
+        try:
+            if len(subscribers) == 1:
+                await self._pubsub.subscribe(progress_key(hypothesis_id))
+                self._active.set()
+            if last_event_id is not None:
+                await self._replay(hypothesis_id, last_event_id, updates)
+            yield updates
+        finally:
+            subscribers.discard(updates)
+            if not subscribers and self._subscribers.get(hypothesis_id) is subscribers:
+                del self._subscribers[hypothesis_id]
+                with contextlib.suppress(RedisError):
+                    await self._pubsub.unsubscribe(progress_key(hypothesis_id))
+
+    def subscriber_count(self) -> int:
+        """Returns the number of active subscriptions."""
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def _replay(self, hypothesis_id: str, last_event_id: str, updates: asyncio.Queue):
+        """
+        Puts the stream events after `last_event_id` ahead of the live events
+        that arrived since subscribing, without delivering any event twice.
+        """
+        try:
+            _id_order(last_event_id)
+        except ValueError:
+            logger.warning("Ignoring invalid Last-Event-ID %r", last_event_id)
+            return
+
+        start = "-" if last_event_id == "0" else f"({last_event_id}"
+        entries = await self._redis.xrange(progress_key(hypothesis_id), start, "+")
+        missed = [
+            ProgressEvent(id=entry_id, data=json.loads(fields["data"]), raw=fields["data"])
+            for entry_id, fields in entries
+        ]
+        live: List[ProgressEvent] = []
+        while not updates.empty():
+            live.append(updates.get_nowait())
+
+        latest = _id_order(missed[-1].id) if missed else _id_order(last_event_id)
+        for event in missed + [event for event in live if _id_order(event.id) > latest]:
+            self._offer(updates, event)
+
+    @staticmethod
+    def _offer(updates: asyncio.Queue, event: ProgressEvent):
+        if updates.full():
+            updates.get_nowait()
+        updates.put_nowait(event)
+
+    def _route(self, channel: str, message: str):
+        hypothesis_id = channel[len(PROGRESS_PREFIX) + 1:]
+        try:
+            event = ProgressEvent.parse(message)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed progress event on %s: %r", channel, message)
+            return
+
+        for updates in self._subscribers.get(hypothesis_id, ()):
+            self._offer(updates, event)
+
+    async def _read(self):
+        """Receives events from Redis and routes them until cancelled."""
+        while True:
+            # Wait without reading while no channel is subscribed
+            if not self._pubsub.subscribed:
+                self._active.clear()
+                await self._active.wait()
+                continue
+
+            try:
+                message = await self._pubsub.get_message(timeout=None)
+            except RedisError as e:
+                logger.error("Progress hub failed to read from Redis: %s", e)
+                await asyncio.sleep(HUB_RECONNECT_DELAY)
+                continue
+            if message is not None and message["type"] == "message":
+                self._route(message["channel"], message["data"])
+
+    async def close(self):
+        """Stops the background reader task and closes the Redis subscription."""
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+            self._reader = None
+        if self._pubsub is not None:
+            with contextlib.suppress(RedisError):
+                await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribers.clear()
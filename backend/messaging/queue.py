@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set
+import ulid
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+@dataclass
+class Job:
+    """
+    A job claimed from a JobQueue.
+
+    Attributes:
+        id (str): The unique job ID.
+        payload (Dict[str, Any]): The JSON payload given when enqueuing.
+        attempts (int): How many times the job was delivered before this one.
+        priority (str): The priority class the job was queued with.
+        raw (str): The serialized job as stored in Redis, used to acknowledge it.
+    """
+    id: str
+    payload: Dict[str, Any]
+    attempts: int
+    priority: str
+    raw: str
+
+class JobQueue:
+    """
+    A durable Redis job queue with at-least-once delivery.
+
+    Enqueued jobs wait in one pending list per priority class, and are
+    claimed from the highest priority list that is not empty. A worker
+    claims a job by atomically moving it to the processing list and holding
+    a lease key that expires after the visibility timeout; the worker keeps
+    extending the lease while it works and removes the job when it
+    acknowledges it. Jobs whose lease
+    expired, e.g. because their worker crashed, are put back on the pending
+    list by `requeue_expired`, or dead-lettered after too many attempts.
+
+    Attributes:
+        name (str): The queue name, used in Redis keys.
+        priorities (Sequence[str]): The priority classes, highest first.
+        visibility_timeout (int): Seconds a claimed job stays invisible to
+            other workers without its lease being extended.
+        max_attempts (int): Deliveries after which a job is dead-lettered.
+    """
+
+    def __init__( # pylint: disable=R0913,R0917
+            self,
+            redis: Redis,
+            name: str,
+            priorities: Sequence[str] = ("default",),
+            visibility_timeout: int = JOB_VISIBILITY_TIMEOUT,
+            max_attempts: int = JOB_MAX_ATTEMPTS
+    ):
+        self._redis = redis
+        self.name = name
+        self.priorities = tuple(priorities)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        # Processing entries seen without a lease by the previous reaper pass
+        self._suspects: Set[str] = set()
+
+    @property
+    def processing_key(self) -> str:
+        """The Redis key of the list of claimed jobs."""
+        return f"queue:{self.name}:processing"
+
+    @property
+    def dead_key(self) -> str:
+        """The Redis key of the list of dead-lettered jobs."""
+        return f"queue:{self.name}:dead"
+
+    def lease_key(self, job_id: str) -> str:
+        """Returns the Redis key of the lease of a claimed job."""
+        return f"queue:{self.name}:lease:{job_id}"
+
+    def pending_key(self, priority: str) -> str:
+        """Returns the Redis key of the pending list of a priority class."""
+        return f"queue:{self.name}:pending:{priority}"
+
+    async def enqueue(self, payload: Dict[str, Any], priority: Optional[str] = None) -> str:
+        """
+        Adds a job to the queue.
+
+        Args:
+            payload (Dict[str, Any]): A JSON-serialisable job payload.
+            priority (Optional[str]): The priority class, defaults to the lowest.
+
+        Returns:
+            str: The job ID.
+        """
+        priority = priority or self.priorities[-1]
+        if priority not in self.priorities:
+            raise ValueError(f"Unknown priority '{priority}' for queue {self.name}.")
+
+        job_id = str(ulid.new())
+        raw = json.dumps({
+            "id": job_id,
+            "payload": payload,
+            "attempts": 0,
+            "priority": priority,
+            "enqueued_at": time.time(),
+        })
+        await self._redis.lpush(self.pending_key(priority), raw)
+        return job_id
+
+    async def dequeue(self, timeout: float = 5.0) -> Optional[Job]:
+        """
+        Claims the oldest job of the highest priority class that has one.
+
+        When all classes are empty, waits up to `timeout` seconds for a job
+        of the highest priority class; a timeout of 0 does not wait.
+
+        Returns:
+            Optional[Job]: The claimed job, or None if the queue stayed empty.
+        """
+        raw = None
+        for priority in self.priorities:
+            raw = await self._redis.lmove(
+                self.pending_key(priority), self.processing_key, "RIGHT", "LEFT"
+            )
+            if raw is not None:
+                break
+        else:
+            if timeout <= 0:
+                return None
+            raw = await self._redis.blmove(
+                self.pending_key(self.priorities[0]), self.processing_key,
+                timeout, "RIGHT", "LEFT"
+            )
+        if raw is None:
+            return None
+
+        data = json.loads(raw)
+        await self._redis.set(self.lease_key(data["id"]), "1", ex=self.visibility_timeout)
+        return Job(
+            id=data["id"],
+            payload=data["payload"],
+            attempts=data["attempts"],
+            priority=data["priority"],
+            raw=raw
+        )
+
+    async def extend(self, job: Job):
+        """Renews the lease of a job that is still being worked on."""
+        await self._redis.set(self.lease_key(job.id), "1", ex=self.visibility_timeout)
+
+    async def ack(self, job: Job):
+        """Marks a job as done, removing it from the queue for good."""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key, 1, job.raw)
+            pipe.delete(self.lease_key(job.id))
+            await pipe.execute()
+
+    async def defer(self, job: Job, front: bool = False):
+        """
+        Returns a claimed job unprocessed to its pending list, e.g. when it
+        may not run yet. This does not count as an attempt.
+
+        Args:
+            job (Job): The claimed job.
+            front (bool): Put the job back at the head of the list, so that it
+                is claimed next, instead of at the back.
+        """
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key, 1, job.raw)
+            pipe.delete(self.lease_key(job.id))
+            if front:
+                pipe.rpush(self.pending_key(job.priority), job.raw)
+            else:
+                pipe.lpush(self.pending_key(job.priority), job.raw)
+            await pipe.execute()
+
+    async def requeue_expired(self) -> int:
+        """
+        Returns jobs whose lease expired to the pending list.
+
+        A job is claimed and leased in two commands, so a job is only
+        requeued once two consecutive passes found it without a lease.
+        Call this periodically, at an interval of a few seconds or more.
+
+        Returns:
+            int: The number of requeued or dead-lettered jobs.
+        """
+        entries = await self._redis.lrange(self.processing_key, 0, -1)
+        suspects, requeued = set(), 0
+
+        for raw in entries:
+            job_id = json.loads(raw)["id"]
+            if await self._redis.exists(self.lease_key(job_id)):
+                continue
+            if raw not in self._suspects:
+                suspects.add(raw)
+                continue
+
+            # Only the process that removes the entry requeues it
+            if not await self._redis.lrem(self.processing_key, 1, raw):
+                continue
+
+            data = json.loads(raw)
+            data["attempts"] += 1
+            if data["attempts"] >= self.max_attempts:
+                logger.error("Job %s on queue %s failed %d times, dead-lettering it",
+                             job_id, self.name, data["attempts"])
+                await self._redis.lpush(self.dead_key, json.dumps(data))
+            else:
+                logger.warning("Job %s on queue %s lost its lease, requeuing it",
+                               job_id, self.name)
+                await self._redis.rpush(self.pending_key(data["priority"]), json.dumps(data))
+            requeued += 1
+
+        self._suspects = suspects
+        return requeued
+
+    async def pending_counts(self) -> Dict[str, int]:
+        """Returns the number of pending jobs per priority class."""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for priority in self.priorities:
+                pipe.llen(self.pending_key(priority))
+            counts = await pipe.execute()
+        return dict(zip(self.priorities, counts))
+
+    async def size(self) -> int:
+        """Returns the number of pending jobs of all priority classes."""
+        return sum((await self.pending_counts()).values())
+
+    async def peek(self, priority: str, count: int) -> List[Dict[str, Any]]:
+        """Returns the next `count` pending jobs of a priority class, next first."""
+        entries = await self._redis.lrange(self.pending_key(priority), -count, -1)
+        return [json.loads(raw) for raw in reversed(entries)]
@@ -1,4 +1,3 @@
-import asyncio
 import os
 from typing import AsyncGenerator, Optional
 from redis.asyncio import Redis
@@ -35,16 +34,16 @@ class AsyncRedisClient:
     async def subscribe(self, channel: str) -> AsyncGenerator[str, None]:
         """
         Subscribe to a Redis channel and yield messages asynchronously.
+
+        Waits on the connection for each message instead of polling.
         """
         pubsub = self.redis.pubsub()
         await pubsub.subscribe(channel)
 
         try:
-            while True:
-                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                if message and message["type"] == "message":
+            async for message in pubsub.listen():
+                if message["type"] == "message":
                     yield message["data"]
-                await asyncio.sleep(0.1)  # Allow the event loop to process other tasks
         finally:
             await pubsub.unsubscribe(channel)
             await pubsub.close()
@@ -0,0 +1,90 @@
+import logging
+import os
+from typing import Optional
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_TTL = int(os.getenv("SINGLE_FLIGHT_TTL", "60"))
+
+class SingleFlight:
+    """
+    Elects one leader per key across processes, so that identical work runs
+    once while others wait for its outcome.
+
+    The leader holds a Redis key that expires after `ttl` seconds unless
+    refreshed, so a crashed leader is replaced. When the leader releases the
+    key it publishes on the key's channel to wake up its followers.
+
+    Attributes:
+        name (str): Name of the coalesced work, used in Redis keys.
+        ttl (int): Seconds a leadership lasts without being refreshed.
+    """
+
+    def __init__(self, redis: Redis, name: str, ttl: int = SINGLE_FLIGHT_TTL):
+        self._redis = redis
+        self.name = name
+        self.ttl = ttl
+
+    def _leader_key(self, key: str) -> str:
+        return f"singleflight:{self.name}:{key}"
+
+    def channel(self, key: str) -> str:
+        """Returns the channel on which the end of a leadership is announced."""
+        return f"singleflight:{self.name}:{key}:done"
+
+    async def try_lead(self, key: str, owner: str) -> Optional[str]:
+        """
+        Tries to become the leader for a key.
+
+        Returns:
+            Optional[str]: None if `owner` is now the leader, otherwise the
+            current leader.
+        """
+        while True:
+            if await self._redis.set(self._leader_key(key), owner, nx=True, ex=self.ttl):
+                return None
+            leader = await self._redis.get(self._leader_key(key))
+            if leader is not None:
+                return leader
+
+    async def leader(self, key: str) -> Optional[str]:
+        """Returns the current leader for a key, if any."""
+        return await self._redis.get(self._leader_key(key))
+
+    async def refresh(self, key: str, owner: str) -> bool:
+        """
+        Extends a leadership that is still held by `owner`.
+
+        Returns:
+            bool: Whether `owner` still leads; False once its leadership
+            expired, even if another owner has taken over since.
+        """
+        leader_key = self._leader_key(key)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(leader_key)
+                if await pipe.get(leader_key) != owner:
+                    return False
+                pipe.multi()
+                pipe.expire(leader_key, self.ttl)
+                await pipe.execute()
+                return True
+            except WatchError:
+                logger.warning("Leadership of %s for %s changed while refreshing it", owner, key)
+                return False
+
+    async def release(self, key: str, owner: str):
+        """Ends the leadership of `owner`, if it still holds it, and wakes its followers."""
+        leader_key = self._leader_key(key)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(leader_key)
+                if await pipe.get(leader_key) == owner:
+                    pipe.multi()
+                    pipe.delete(leader_key)
+                    await pipe.execute()
+            except WatchError:
+                logger.warning("Leadership of %s for %s changed while releasing it", owner, key)
+        await self._redis.publish(self.channel(key), owner)
@@ -1,34 +1,33 @@
-from pipeline.utils.helpers import publish_update, handle_pipeline_error
+from typing import Optional
 from sqlalchemy.orm import Session
-from db.models import Hypothesis
-from openai import OpenAI
+from pipeline.orchestrator.engine import Pipeline, Step
+from db.models import Hypothesis, PipelineRun
+from core.llm import chat_completion
 
-client = OpenAI()
+async def _interpret(hypothesis: Hypothesis) -> str:
+    # Generate discourse using LLM
+    hypothesis.result = await chat_completion(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": "You are a critical thinker trying \
+             to challenge the input hypotheses, based on facts for which you cite sources."},
+            {"role": "user", "content": f"Interpret and discuss the claim: {hypothesis.content}"}
+        ],
+    )
+    return hypothesis.result
 
-async def start_abstract_pipeline(hypothesis: Hypothesis, db: Session):
+ABSTRACT_PIPELINE = Pipeline("abstract", [
+    Step("InterpretAbstractClaim", "Interpreting Abstract Claim", _interpret,
+         inputs=("hypothesis",), output="interpretation",
+         describe=lambda _: "Abstract claim processed."),
+])
+
+async def start_abstract_pipeline(
+        hypothesis: Hypothesis,
+        db: Session,
+        pipeline_run: Optional[PipelineRun] = None
+):
     """
     Orchestrates the abstract hypothesis validation pipeline.
     """
-    try:
-        step = "InterpretAbstractClaim"
-        title = "Interpreting Abstract Claim"
-
-        await publish_update(hypothesis, step, title)
-
-        # Generate discourse using LLM
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a critical thinker trying \
-                 to challenge the input hypotheses, based on facts for which you cite sources."},
-                {"role": "user", "content": f"Interpret and discuss the claim: {hypothesis.content}"}
-            ],
-        )
-        hypothesis.result = response.choices[0].message.content
-        hypothesis.status = "Completed"
-        db.commit()
-
-        await publish_update(hypothesis, step, title, comment="Abstract claim processed.")
-
-    except Exception as e:
-        await handle_pipeline_error(e, step, title, hypothesis, db)
\ No newline at end of file
+    return await ABSTRACT_PIPELINE.run(hypothesis, db, pipeline_run=pipeline_run)
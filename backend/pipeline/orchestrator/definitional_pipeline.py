@@ -1,53 +1,11 @@
-import asyncio
 import logging
+from typing import Optional
 from sqlalchemy.orm import Session
-from pipeline.utils.helpers import publish_update, handle_pipeline_error
-from db.models import Hypothesis
+from pipeline.orchestrator.engine import Pipeline, Step
+from db.models import Hypothesis, PipelineRun
 
 logger = logging.getLogger(__name__)
 
-async def start_definitional_pipeline(hypothesis: Hypothesis, db: Session):
-    """
-    Orchestrates the definitional hypothesis validation pipeline.
-    """
-    result = []
-    comment = ""
-
-    try:
-        steps = [
-            ("SearchingFact", "Perform web search", perform_web_search),
-            ("EvaluatingFact", "Evaluate definitional claim", evaluate_definitional_claim),
-        ]
-
-        for step, title, step_function in steps:
-            # Publish status before step
-            await publish_update(hypothesis, step, title)
-
-            # Execute the step
-            result = await step_function(hypothesis, db)
-            comment = f"Step '{title}' completed successfully."
-
-            # Publish completion for this step
-            await publish_update(hypothesis, step, title, comment=comment)
-
-        # Mark pipeline as completed
-        hypothesis.status = "Completed"
-        db.commit()
-
-    except (asyncio.TimeoutError, ValueError, TypeError, RuntimeError) as e:
-        await handle_pipeline_error(e, step, title, hypothesis, db, include_traceback=False)
-        return
-
-    except Exception as e:  # pylint: disable=broad-except
-        await handle_pipeline_error(e, step, title, hypothesis, db, include_traceback=True)
-        return
-
-    finally:
-        if hypothesis.status not in ["Completed", "Failed", "Skipped"]:
-            hypothesis.status = "Failed"
-            db.commit()
-
-
 async def perform_web_search(hypothesis: Hypothesis, db: Session):
     """
     Example step: Perform a definitional search.
@@ -58,11 +16,29 @@ async def perform_web_search(hypothesis: Hypothesis, db: Session):
     return [{"fact": "Example fact"}]
 
 
-async def evaluate_definitional_claim(hypothesis: Hypothesis, db: Session):
+async def evaluate_definitional_claim(hypothesis: Hypothesis, db: Session, web_results: list):
     """
     Example step: Evaluate the definitional claim.
     Replace this with actual implementation.
     """
     # Mock implementation: Replace with definitional evaluation logic
     logger.info(f"Evaluating definitional claim for: {hypothesis.content}")
-    return {"classification": "Verified", "details": "The claim is definitional."}
\ No newline at end of file
+    return {"classification": "Verified", "details": "The claim is definitional."}
+
+
+DEFINITIONAL_PIPELINE = Pipeline("definitional", [
+    Step("SearchingFact", "Perform web search", perform_web_search,
+         inputs=("hypothesis", "db"), output="web_results"),
+    Step("EvaluatingFact", "Evaluate definitional claim", evaluate_definitional_claim,
+         inputs=("hypothesis", "db", "web_results"), output="evaluation"),
+])
+
+async def start_definitional_pipeline(
+        hypothesis: Hypothesis,
+        db: Session,
+        pipeline_run: Optional[PipelineRun] = None
+):
+    """
+    Orchestrates the definitional hypothesis validation pipeline.
+    """
+    return await DEFINITIONAL_PIPELINE.run(hypothesis, db, pipeline_run=pipeline_run)
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from core.metrics import PIPELINE_RUN_DURATION, PIPELINE_STEP_DURATION, track_duration
+from core.tracing import span
+from crud import pipeline_runs as crud_pipeline_runs
+from pipeline.utils.helpers import publish_update, handle_pipeline_error
+from db.models import Hypothesis, PipelineRun
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_STEP_TIMEOUT = float(os.getenv("PIPELINE_STEP_TIMEOUT", "300"))  # seconds
+# Hypothesis statuses of a finished validation
+FINAL_STATUSES = ("Completed", "Failed", "Skipped", "InsufficientSources")
+
+def checkpoint_step(db: Session, run_id: str, name: str, result: Any):
+    """
+    Checkpoints a step output of a pipeline run. A failed checkpoint is
+    logged and rolled back rather than failing the run, which then merely
+    repeats the step if it is resumed.
+    """
+    try:
+        crud_pipeline_runs.save_step_result(db, run_id, name, result)
+    except SQLAlchemyError as e:
+        logger.error("Failed to checkpoint step %s of run %s: %s", name, run_id, e)
+        db.rollback()
+
+class PipelineHalt(Exception):
+    """
+    Raised by a step to end its pipeline early with a final status,
+    e.g. "InsufficientSources" when no usable evidence was found.
+    """
+
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+@dataclass(frozen=True)
+class Step:
+    """
+    A pipeline step.
+
+    Attributes:
+        name (str): The step name published in progress updates.
+        title (str): The human-readable step title.
+        run (Callable[..., Awaitable[Any]]): The step coroutine function,
+            called with its inputs as keyword arguments.
+        inputs (Tuple[str, ...]): Names of the results the step needs.
+            "hypothesis" and "db" are always available.
+        output (Optional[str]): Name under which the step's result is stored.
+        describe (Optional[Callable[[Any], str]]): Builds the completion
+            comment from the step's result.
+        timeout (float): Seconds after which the step fails.
+    """
+    name: str
+    title: str
+    run: Callable[..., Awaitable[Any]]
+    inputs: Tuple[str, ...] = ()
+    output: Optional[str] = None
+    describe: Optional[Callable[[Any], str]] = None
+    timeout: float = PIPELINE_STEP_TIMEOUT
+
+class Pipeline:
+    """
+    Runs a validation pipeline as a DAG of steps.
+
+    A step starts as soon as all of its inputs are available, so steps that
+    do not depend on each other run concurrently. Every step publishes a
+    progress update before and after it runs. The first failing step fails
+    the pipeline and cancels the steps still running.
+
+    When run as part of a PipelineRun, each step output is checkpointed in
+    the step_results table, and steps with a checkpointed output are not run
+    again when the run is resumed.
+
+    Attributes:
+        name (str): The pipeline name, used in logs.
+        steps (List[Step]): The steps, in the order they are listed in updates.
+    """
+
+    def __init__(self, name: str, steps: List[Step]):
+        self.name = name
+        self.steps = steps
+        self._validate()
+
+    def _validate(self):
+        """Checks that outputs are unique and every input is produced without cycles."""
+        outputs = [step.output for step in self.steps if step.output]
+        if len(outputs) != len(set(outputs)):
+            raise ValueError(f"Pipeline '{self.name}' has duplicate step outputs.")
+
+        available = {"hypothesis", "db"}
+        remaining = list(self.steps)
+        while remaining:
+            ready = [step for step in remaining if set(step.inputs) <= available]
+            if not ready:
+                names = ", ".join(step.name for step in remaining)
+                raise ValueError(
+                    f"Pipeline '{self.name}' has steps with unsatisfiable inputs: {names}"
+                )
+            for step in ready:
+                remaining.remove(step)
+                if step.output:
+                    available.add(step.output)
+
+    async def _run_step(self, step: Step, results: Dict[str, Any]) -> Any:
+        hypothesis = results["hypothesis"]
+        await publish_update(hypothesis, step.name, step.title)
+
+        with span(f"{self.name}.{step.name}", {"pipeline.step": step.name}), \
+                track_duration(PIPELINE_STEP_DURATION, pipeline=self.name, step=step.name):
+            result = await asyncio.wait_for(
+                step.run(**{name: results[name] for name in step.inputs}),
+                timeout=step.timeout
+            )
+
+        comment = step.describe(result) if step.describe \
+            else f"Step '{step.title}' completed successfully."
+        await publish_update(hypothesis, step.name, step.title, comment=comment)
+        return result
+
+    async def run(
+            self,
+            hypothesis: Hypothesis,
+            db: Session,
+            results: Optional[Dict[str, Any]] = None,
+            pipeline_run: Optional[PipelineRun] = None
+    ) -> Dict[str, Any]:
+        """
+        Runs the pipeline and records its final status on the hypothesis.
+
+        The duration of every step and of the whole run is recorded in the
+        pipeline metrics and as trace spans.
+
+        Args:
+            hypothesis (Hypothesis): The hypothesis to validate.
+            db (Session): Database session.
+            results (Optional[Dict[str, Any]]): Results of steps that already
+                ran; steps whose output is given are skipped.
+            pipeline_run (Optional[PipelineRun]): The run to checkpoint step
+                outputs in and to resume from.
+
+        Returns:
+            Dict[str, Any]: The results of all steps, keyed by output name.
+        """
+        with span(f"pipeline.{self.name}", {"hypothesis.id": hypothesis.id}) as active:
+            results = await self._run(hypothesis, db, results, pipeline_run)
+            if active is not None:
+                active.set_attribute("pipeline.status", hypothesis.status)
+        return results
+
+    async def _pending_steps(
+            self,
+            results: Dict[str, Any],
+            checkpointed: Dict[str, Any]
+    ) -> List[Step]:
+        """Returns the steps whose output is not available yet."""
+        pending = []
+        for step in self.steps:
+            if step.output and step.output in results:
+                if step.output in checkpointed:
+                    await publish_update(results["hypothesis"], step.name, step.title,
+                                         comment="Restored from checkpoint.")
+                continue
+            pending.append(step)
+        return pending
+
+    def _start_ready_steps(
+            self,
+            pending: List[Step],
+            running: Dict[asyncio.Task, Step],
+            results: Dict[str, Any]
+    ):
+        """Starts the pending steps whose inputs are all available."""
+        for step in [step for step in pending if all(name in results for name in step.inputs)]:
+            pending.remove(step)
+            running[asyncio.create_task(self._run_step(step, results))] = step
+
+    def _store_result(
+            self,
+            step: Step,
+            result: Any,
+            results: Dict[str, Any],
+            pipeline_run: Optional[PipelineRun]
+    ):
+        """Makes a step's output available to later steps and checkpoints it."""
+        if step.output:
+            results[step.output] = result
+            if pipeline_run is not None:
+                checkpoint_step(results["db"], pipeline_run.id, step.output, result)
+
+    async def _fail(self, e: Exception, step: Optional[Step], hypothesis: Hypothesis, db: Session):
+        """
+        Fails the pipeline, reporting the error on the step that raised it,
+        or on the pipeline itself if no step was running.
+        """
+        # Expected failures are logged without a traceback
+        expected = isinstance(e, (asyncio.TimeoutError, ValueError, TypeError, RuntimeError))
+        await handle_pipeline_error(
+            e,
+            step.name if step else self.name,
+            step.title if step else f"Pipeline {self.name}",
+            hypothesis,
+            db,
+            include_traceback=not expected
+        )
+
+    async def _run(
+            self,
+            hypothesis: Hypothesis,
+            db: Session,
+            results: Optional[Dict[str, Any]],
+            pipeline_run: Optional[PipelineRun]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        checkpointed = crud_pipeline_runs.get_step_results(db, pipeline_run.id) \
+            if pipeline_run is not None else {}
+        results = {**checkpointed, **(results or {}), "hypothesis": hypothesis, "db": db}
+
+        pending = await self._pending_steps(results, checkpointed)
+        running: Dict[asyncio.Task, Step] = {}
+        final_statuses = list(FINAL_STATUSES)
+        current: Optional[Step] = pending[0] if pending else None
+
+        try:
+            while pending or running:
+                self._start_ready_steps(pending, running, results)
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    current = running.pop(task)
+                    self._store_result(current, task.result(), results, pipeline_run)
+
+            hypothesis.status = "Completed"
+            db.commit()
+
+        except PipelineHalt as halt:
+            logger.info("Pipeline %s halted for hypothesis %s: %s",
+                        self.name, hypothesis.id, halt.message)
+            final_statuses.append(halt.status)
+            hypothesis.status = halt.status
+            db.commit()
+
+        except Exception as e: # pylint: disable=broad-except
+            await self._fail(e, current, hypothesis, db)
+
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+            if hypothesis.status not in final_statuses:
+                hypothesis.status = "Failed"
+                db.commit()
+
+            PIPELINE_RUN_DURATION.labels(pipeline=self.name, status=hypothesis.status) \
+                .observe(time.perf_counter() - started)
+
+        return results
@@ -1,63 +1,36 @@
-import asyncio
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
-from core import utils
-from pipeline.utils.helpers import publish_update, handle_pipeline_error
+from pipeline.orchestrator.engine import Pipeline, Step
+from pipeline.utils.helpers import save_validation_result
 from pipeline.steps.factual.wikisearch import factual_search_step
 from pipeline.steps.factual.evaluation import evaluate_factual_claim
-from db.models import Hypothesis, ValidationResult
-
-async def start_factual_pipeline(hypothesis: Hypothesis, db: Session):
+from db.models import Hypothesis, PipelineRun
+
+async def _search(hypothesis: Hypothesis, db: Session) -> List[Dict[str, Any]]:
+    return await factual_search_step(hypothesis, db=db)
+
+async def _evaluate(
+        hypothesis: Hypothesis,
+        db: Session,
+        articles: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    result = await evaluate_factual_claim(hypothesis, articles)
+    save_validation_result(db, hypothesis, result)
+    return result
+
+FACTUAL_PIPELINE = Pipeline("factual", [
+    Step("SearchingFact", "Search Wikipedia", _search,
+         inputs=("hypothesis", "db"), output="articles"),
+    Step("EvaluatingFact", "Evaluate factual claim", _evaluate,
+         inputs=("hypothesis", "db", "articles"), output="evaluation"),
+])
+
+async def start_factual_pipeline(
+        hypothesis: Hypothesis,
+        db: Session,
+        pipeline_run: Optional[PipelineRun] = None
+):
     """
     Orchestrates the factual hypothesis validation pipeline.
     """
-    result = []
-    comment = ""
-
-    try:
-        steps = [
-            ("SearchingFact", "Search Wikipedia", factual_search_step),
-            ("EvaluatingFact", "Evaluate factual claim", evaluate_factual_claim),
-        ]
-
-        for step, title, step_function in steps:
-            # Publish status before step
-            await publish_update(hypothesis, step, title)
-
-            # Execute the step
-            if step == "SearchingFact":
-                result = await step_function(hypothesis)
-                comment = f"Step '{title}' completed successfully."
-            elif step == "EvaluatingFact":
-                result = await step_function(hypothesis, result)
-                validation_result = ValidationResult(
-                    id=utils.generate_id('V'),
-                    hypothesis_id=hypothesis.id,
-                    classification=result.get("classification"),
-                    motivation=result.get("motivation"),
-                    sources=result.get("sources", [])
-                )
-                db.add(validation_result)
-                db.commit()
-                db.refresh(validation_result)
-
-                comment = f"Step '{title}' completed successfully."
-
-            # Publish completion for this step
-            await publish_update(hypothesis, step, title, comment=comment)
-
-        # Mark pipeline as completed
-        hypothesis.status = "Completed"
-        db.commit()
-
-    except (asyncio.TimeoutError, ValueError, TypeError, RuntimeError) as e:
-        await handle_pipeline_error(e, step, title, hypothesis, db, include_traceback=False)
-        return
-
-    except Exception as e:  # pylint: disable=broad-except
-        await handle_pipeline_error(e, step, title, hypothesis, db, include_traceback=True)
-        return
-
-    finally:
-        if hypothesis.status not in ["Completed", "Failed", "Skipped"]:
-            hypothesis.status = "Failed"
-            db.commit()
+    return await FACTUAL_PIPELINE.run(hypothesis, db, pipeline_run=pipeline_run)
@@ -1,31 +1,502 @@
 import asyncio
+import contextlib
 import logging
 import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from redis.asyncio import Redis
 from sqlalchemy.orm import Session
-from pipeline.utils.helpers import publish_update, handle_pipeline_error
+from sqlalchemy.exc import SQLAlchemyError
+from core import utils
+from core.metrics import (
+    PIPELINE_QUEUE_DEPTH, PIPELINE_RUNNING, PIPELINE_STEP_DURATION, track_duration
+)
+from core.tracing import current_traceparent, span
+from crud import pipeline_runs as crud_pipeline_runs
+from crud.hypothesises import hypothesis_content_hash
+from messaging.hub import ProgressEvent, progress_key, publish_progress
+from messaging.queue import Job, JobQueue
+from messaging.single_flight import SingleFlight
+from pipeline.utils.helpers import (
+    publish_update, publish_queue_position, handle_pipeline_error, redis_client
+)
 from pipeline.steps.common.nlu import extract_topic_terms
 from pipeline.orchestrator.academic_pipeline import start_academic_pipeline
 from pipeline.orchestrator.factual_pipeline import start_factual_pipeline
 from pipeline.orchestrator.definitional_pipeline import start_definitional_pipeline
 from pipeline.orchestrator.abstract_pipeline import start_abstract_pipeline
-from db.models import Hypothesis
+from pipeline.orchestrator.engine import FINAL_STATUSES, checkpoint_step
+from db.database import SessionLocal
+from db.models import Hypothesis, PipelineRun, ValidationResult
 
 DEBUG_MODE = os.getenv("DEBUG", "False").lower() in ("true", "1")
 logger = logging.getLogger(__name__)
 
+PIPELINE_MAX_RUNNING = int(os.getenv("PIPELINE_MAX_RUNNING", "8"))
+PIPELINE_MAX_RUNNING_PER_USER = int(os.getenv("PIPELINE_MAX_RUNNING_PER_USER", "2"))
+PIPELINE_MAX_QUEUED = int(os.getenv("PIPELINE_MAX_QUEUED", "200"))
+QUEUE_POSITION_UPDATES = 20  # waiting jobs notified of their position after each claim
+VALIDATION_REUSE_WINDOW = int(os.getenv("VALIDATION_REUSE_WINDOW", "3600"))  # seconds, 0 disables
+FOLLOW_CHECK_INTERVAL = 5.0  # seconds between checks that a followed leader is alive
+# Seconds between heartbeats of a running pipeline run, well below PIPELINE_RUN_STALE_AFTER
+PIPELINE_RUN_HEARTBEAT_INTERVAL = float(os.getenv("PIPELINE_RUN_HEARTBEAT_INTERVAL", "30"))
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+class QueueFullError(Exception):
+    """Raised when a validation is submitted while the pipeline queue is full."""
+
+class PipelineScheduler:
+    """
+    Admission control and priority scheduling for validation pipelines.
+
+    Validations are queued as jobs with an interactive or bulk priority;
+    interactive jobs are always claimed first. A claimed job only runs when
+    fewer than `max_running` pipelines run in total and fewer than
+    `max_running_per_user` for its user; otherwise it goes back to the queue.
+    Running pipelines are tracked in Redis sorted sets scored by lease
+    expiry, so the caps hold across worker processes and slots of crashed
+    workers free up by themselves.
+
+    Attributes:
+        queue (JobQueue): The underlying job queue.
+        max_running (int): Pipelines allowed to run at once.
+        max_running_per_user (int): Pipelines allowed to run at once per user.
+        max_queued (int): Pending jobs above which submissions are rejected.
+    """
+
+    def __init__( # pylint: disable=R0913,R0917
+            self,
+            redis: Redis,
+            queue: JobQueue,
+            max_running: int = PIPELINE_MAX_RUNNING,
+            max_running_per_user: int = PIPELINE_MAX_RUNNING_PER_USER,
+            max_queued: int = PIPELINE_MAX_QUEUED
+    ):
+        self.queue = queue
+        self.max_running = max_running
+        self.max_running_per_user = max_running_per_user
+        self.max_queued = max_queued
+        self._redis = redis
+        self._running_key = f"scheduler:{queue.name}:running"
+
+    def _user_running_key(self, user_id: str) -> str:
+        return f"{self._running_key}:user:{user_id}"
+
+    async def submit(
+            self,
+            hypothesis_id: str,
+            user_id: str,
+            priority: str = PRIORITY_INTERACTIVE
+    ) -> str:
+        """
+        Queues a hypothesis for validation and publishes its queue position.
+
+        The job carries the active trace context, so that the worker's spans
+        continue the trace of the request that submitted it.
+
+        Raises:
+            QueueFullError: If `max_queued` jobs are already waiting.
+
+        Returns:
+            str: The job ID.
+        """
+        await self.check_admission()
+
+        job_id = await self.queue.enqueue(
+            {"hypothesis_id": hypothesis_id, "user_id": user_id,
+             "traceparent": current_traceparent()},
+            priority=priority
+        )
+
+        counts = await self.queue.pending_counts()
+        position = -1
+        for other in self.queue.priorities:
+            position += counts[other]
+            if other == priority:
+                break
+        await publish_queue_position(hypothesis_id, max(position, 0))
+        return job_id
+
+    async def check_admission(self):
+        """
+        Checks that a validation may be submitted now.
+
+        Raises:
+            QueueFullError: If `max_queued` jobs are already waiting.
+        """
+        if await self.queue.size() >= self.max_queued:
+            raise QueueFullError(f"{self.max_queued} validations are already queued.")
+
+    async def claim(self, timeout: float = 1.0) -> Optional[Job]:
+        """
+        Claims the next job that may run within the concurrency caps.
+
+        Waits up to `timeout` seconds for a pending job. While all running
+        slots are taken no job is claimed, so pending jobs keep their order.
+        A job whose user is at their cap goes to the back of its list so that
+        other users' jobs can run; a job that lost a race for the last slot
+        goes back to the head. After putting a job back or finding no free
+        slot, this waits `timeout` seconds so that workers do not spin.
+
+        Returns:
+            Optional[Job]: A job holding a running slot, or None.
+        """
+        if await self.running_count() >= self.max_running:
+            await asyncio.sleep(timeout)
+            return None
+
+        job = await self.queue.dequeue(timeout=timeout)
+        if job is None:
+            return None
+
+        exceeded = await self._acquire_slot(job)
+        if exceeded is not None:
+            await self.queue.defer(job, front=exceeded == "global")
+            await asyncio.sleep(timeout)
+            return None
+
+        await self._publish_positions()
+        return job
+
+    async def heartbeat(self, job: Job):
+        """Extends the lease and the running slot of a job that is still running."""
+        await self.queue.extend(job)
+        expires_at = time.time() + self.queue.visibility_timeout
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._running_key, {job.id: expires_at}, xx=True)
+            pipe.zadd(self._user_running_key(job.payload["user_id"]), {job.id: expires_at}, xx=True)
+            await pipe.execute()
+
+    async def release(self, job: Job):
+        """Frees the running slot of a finished job and acknowledges it."""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(self._running_key, job.id)
+            pipe.zrem(self._user_running_key(job.payload["user_id"]), job.id)
+            await pipe.execute()
+        await self.queue.ack(job)
+
+    async def running_count(self) -> int:
+        """Returns the number of pipelines running across all workers."""
+        return await self._redis.zcount(self._running_key, time.time(), "+inf")
+
+    async def update_metrics(self):
+        """Sets the queue depth and running pipeline gauges from Redis."""
+        for priority, count in (await self.queue.pending_counts()).items():
+            PIPELINE_QUEUE_DEPTH.labels(priority=priority).set(count)
+        PIPELINE_RUNNING.set(await self.running_count())
+
+    async def _acquire_slot(self, job: Job) -> Optional[str]:
+        """
+        Takes a global and a per-user running slot for the job.
+
+        Slots are added optimistically and given back when a cap is
+        exceeded, so concurrent claims can only err on the side of waiting.
+
+        Returns:
+            Optional[str]: None if the slots were taken, otherwise the
+            exceeded cap, "user" or "global".
+        """
+        now = time.time()
+        expires_at = now + self.queue.visibility_timeout
+        user_key = self._user_running_key(job.payload["user_id"])
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for key in (self._running_key, user_key):
+                pipe.zremrangebyscore(key, "-inf", now)
+                pipe.zadd(key, {job.id: expires_at})
+                pipe.zcard(key)
+                pipe.expire(key, self.queue.visibility_timeout * 2)
+            results = await pipe.execute()
+
+        running, user_running = results[2], results[6]
+        if running <= self.max_running and user_running <= self.max_running_per_user:
+            return None
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(self._running_key, job.id)
+            pipe.zrem(user_key, job.id)
+            await pipe.execute()
+        return "user" if user_running > self.max_running_per_user else "global"
+
+    async def _publish_positions(self):
+        """Publishes the current queue position of the next waiting jobs."""
+        position = 0
+        for priority in self.queue.priorities:
+            for job in await self.queue.peek(priority, QUEUE_POSITION_UPDATES):
+                await publish_queue_position(job["payload"]["hypothesis_id"], position)
+                position += 1
+            if position >= QUEUE_POSITION_UPDATES:
+                return
+
+pipeline_scheduler = PipelineScheduler(redis_client.redis, JobQueue(
+    redis_client.redis,
+    "validation_pipeline",
+    priorities=(PRIORITY_INTERACTIVE, PRIORITY_BULK)
+))
+
+validation_flight = SingleFlight(redis_client.redis, "validation")
+
+def _copy_validation(source: Hypothesis, target: Hypothesis, db: Session):
+    """Copies the extraction, latest validation result and status of a hypothesis."""
+    target.extracted_topics = source.extracted_topics
+    target.extracted_terms = source.extracted_terms
+    target.extracted_entities = source.extracted_entities
+    target.query_type = source.query_type
+
+    result = db.query(ValidationResult) \
+        .filter(ValidationResult.hypothesis_id == source.id) \
+        .order_by(ValidationResult.date_created.desc()).first()
+    if result is not None:
+        db.add(ValidationResult(
+            id=utils.generate_id('V'),
+            hypothesis_id=target.id,
+            classification=result.classification,
+            motivation=result.motivation,
+            sources=result.sources
+        ))
+
+    target.status = source.status
+    db.commit()
+
+async def _reuse_recent_validation(hypothesis: Hypothesis, db: Session) -> bool:
+    """
+    Copies the result of an identical claim validated within
+    VALIDATION_REUSE_WINDOW, if there is one.
+
+    Returns:
+        bool: Whether a recent result was reused.
+    """
+    if VALIDATION_REUSE_WINDOW <= 0:
+        return False
+
+    since = datetime.now(timezone.utc) - timedelta(seconds=VALIDATION_REUSE_WINDOW)
+    recent = db.query(ValidationResult).join(Hypothesis).filter(
+        Hypothesis.content_hash == hypothesis.content_hash,
+        Hypothesis.id != hypothesis.id,
+        Hypothesis.status == "Completed",
+        ValidationResult.date_created >= since
+    ).order_by(ValidationResult.date_created.desc()).first()
+    if recent is None:
+        return False
+
+    _copy_validation(recent.hypothesis, hypothesis, db)
+    logger.info("Reused the validation of %s for %s", recent.hypothesis_id, hypothesis.id)
+
+    await publish_update(hypothesis, "ExtractingTopics", "Extracting query",
+                         comment=f"Extracted topics: {hypothesis.extracted_topics}")
+    await publish_update(
+        hypothesis, "ReusedResult", "Reused a recent validation",
+        comment=f"Reused the validation of an identical claim ({recent.hypothesis_id})."
+    )
+    await publish_update(hypothesis, "Finished", "Finished processing")
+    return True
+
+async def _follow_validation(hypothesis: Hypothesis, leader_id: str, db: Session) -> bool:
+    """
+    Waits for the in-flight validation of an identical claim, republishing
+    its progress events for this hypothesis, and copies its result.
+
+    The leader's final "Finished" and error events are not republished:
+    clients stop listening and fetch the hypothesis on those, so this
+    hypothesis publishes its own "Finished" once the result is copied.
+
+    Returns:
+        bool: Whether the leader finished; False if it disappeared without
+        finishing, e.g. because its worker crashed.
+    """
+    key = hypothesis.content_hash
+    pubsub = redis_client.redis.pubsub()
+    await pubsub.subscribe(progress_key(leader_id), validation_flight.channel(key))
+
+    try:
+        hypothesis.status = "Processing"
+        db.commit()
+        await publish_update(hypothesis, "AttachedToRun", "Waiting for an identical validation",
+                             comment=f"Following the validation of {leader_id}.")
+
+        while await validation_flight.leader(key) == leader_id:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=FOLLOW_CHECK_INTERVAL
+            )
+            if message is None or message["channel"] != progress_key(leader_id):
+                continue
+            try:
+                update = ProgressEvent.parse(message["data"]).data
+            except (TypeError, ValueError):
+                logger.warning("Ignoring malformed progress event of %s: %r",
+                               leader_id, message["data"])
+                continue
+            if update.get("step") == "Finished" or update.get("error"):
+                continue
+            update["id"] = hypothesis.id
+            await publish_progress(redis_client.redis, hypothesis.id, update)
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+    leader = db.get(Hypothesis, leader_id)
+    if leader is None:
+        return False
+    db.refresh(leader)
+    if leader.status not in FINAL_STATUSES:
+        return False
+
+    _copy_validation(leader, hypothesis, db)
+    logger.info("Copied the validation of %s to %s", leader_id, hypothesis.id)
+    await publish_update(hypothesis, "Finished", "Finished processing")
+    return True
+
+async def _await_own_validation(hypothesis: Hypothesis, db: Session) -> bool:
+    """
+    Waits while another job validates this same hypothesis, e.g. because it
+    was submitted twice or its job was redelivered while still running.
+
+    Returns:
+        bool: Whether that validation finished; False if it disappeared
+        without finishing, e.g. because its worker crashed.
+    """
+    key = hypothesis.content_hash
+    pubsub = redis_client.redis.pubsub()
+    await pubsub.subscribe(validation_flight.channel(key))
+    try:
+        while await validation_flight.leader(key) == hypothesis.id:
+            await pubsub.get_message(ignore_subscribe_messages=True, timeout=FOLLOW_CHECK_INTERVAL)
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+    db.refresh(hypothesis)
+    return hypothesis.status in FINAL_STATUSES
+
+async def _keep_leading(hypothesis: Hypothesis):
+    """
+    Refreshes the hypothesis' leadership of its content hash until cancelled
+    or lost. A lost leadership, e.g. after the event loop stalled for longer
+    than the TTL, is not taken back: the run continues without coalescing,
+    and identical claims attach to the new leader instead.
+    """
+    while True:
+        await asyncio.sleep(validation_flight.ttl / 3)
+        if not await validation_flight.refresh(hypothesis.content_hash, hypothesis.id):
+            logger.warning("Hypothesis %s lost the leadership of its validation", hypothesis.id)
+            return
+
 async def start_validation_pipeline(hypothesis_id: str, db: Session):
     """
-    Routes to the appropriate pipeline based on the hypothesis query_type.
+    Validates a hypothesis, coalescing validations of identical claims.
+
+    A completed validation of the same normalised content within
+    VALIDATION_REUSE_WINDOW seconds is reused as is. While an identical
+    claim is being validated, this hypothesis follows that run instead:
+    it receives the same progress events and a copy of its result.
+    Otherwise the pipeline runs, with this hypothesis as the leader. A job
+    for a hypothesis that is already being validated waits for that run
+    instead of running the pipeline a second time.
     """
     hypothesis = db.query(Hypothesis).filter(Hypothesis.id == hypothesis_id).first()
 
     if not hypothesis:
         raise ValueError(f"Hypothesis with ID {hypothesis_id} not found.")
 
+    if hypothesis.content_hash is None:
+        hypothesis.content_hash = hypothesis_content_hash(hypothesis.content)
+        db.commit()
+
+    if await _reuse_recent_validation(hypothesis, db):
+        return None
+
+    while True:
+        leader_id = await validation_flight.try_lead(hypothesis.content_hash, hypothesis.id)
+        if leader_id is None:
+            break
+        if leader_id == hypothesis.id:
+            logger.info("Hypothesis %s is already being validated, waiting for it", hypothesis.id)
+            if await _await_own_validation(hypothesis, db):
+                return None
+        elif await _follow_validation(hypothesis, leader_id, db):
+            return None
+
+    refresher = asyncio.create_task(_keep_leading(hypothesis))
+    try:
+        return await _run_validation_pipeline(hypothesis, db)
+    finally:
+        refresher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await refresher
+        await validation_flight.release(hypothesis.content_hash, hypothesis.id)
+
+def _heartbeat(pipeline_run_id: str):
+    with SessionLocal() as db:
+        crud_pipeline_runs.heartbeat_run(db, pipeline_run_id)
+
+async def _keep_alive(pipeline_run_id: str):
+    """
+    Heartbeats a pipeline run until cancelled, so that it is not resumed
+    by another worker while it runs. Each heartbeat uses its own session in
+    a worker thread, leaving the pipeline's session alone.
+    """
+    while True:
+        await asyncio.sleep(PIPELINE_RUN_HEARTBEAT_INTERVAL)
+        try:
+            await asyncio.to_thread(_heartbeat, pipeline_run_id)
+        except SQLAlchemyError as e:
+            logger.warning("Failed to heartbeat pipeline run %s: %s", pipeline_run_id, e)
+
+def _start_run(hypothesis: Hypothesis, db: Session) -> PipelineRun:
+    """Resumes an unfinished run of the hypothesis, or starts a new one."""
+    pipeline_run = crud_pipeline_runs.claim_resumable_run(
+        db, hypothesis.id, hypothesis.content_hash
+    )
+    if pipeline_run is not None:
+        logger.info("Resuming pipeline run %s for hypothesis %s", pipeline_run.id, hypothesis.id)
+        return pipeline_run
+    return crud_pipeline_runs.create_run(db, hypothesis)
+
+# Pipelines by the query type of the hypothesis
+QUERY_PIPELINES = {
+    "factual": start_factual_pipeline,
+    "definitional": start_definitional_pipeline,
+    "research-based": start_academic_pipeline,
+    "abstract": start_abstract_pipeline,
+}
+
+async def _extract_query(hypothesis: Hypothesis, db: Session, pipeline_run: PipelineRun):
+    """
+    Extracts the topics, terms, entities and query type of the hypothesis,
+    unless a previous attempt of the run already checkpointed them.
+    """
+    step = "ExtractingTopics"
+    result = crud_pipeline_runs.get_step_results(db, pipeline_run.id).get("extraction")
+    if result is None:
+        with span(f"validation.{step}"), \
+                track_duration(PIPELINE_STEP_DURATION, pipeline="validation", step=step):
+            result = await extract_topic_terms(hypothesis.content)
+        checkpoint_step(db, pipeline_run.id, "extraction", result)
+    hypothesis.extracted_topics = result["topics"]
+    hypothesis.extracted_terms = result["keywords"]
+    hypothesis.extracted_entities = result["named_entities"]
+    hypothesis.query_type = result["query_type"]
+    db.commit()
+
+async def _run_validation_pipeline(hypothesis: Hypothesis, db: Session):
+    """
+    Routes to the appropriate pipeline based on the hypothesis query_type.
+
+    A run that failed or was interrupted, e.g. by a worker restart, is
+    resumed: steps whose output was checkpointed are not run again. A run
+    keeps a heartbeat while it executes, so that it is only resumed once
+    its worker is gone.
+    """
     # Raise status
     hypothesis.status = "Processing"
     db.commit()
 
+    pipeline_run = _start_run(hypothesis, db)
+    heartbeat = asyncio.create_task(_keep_alive(pipeline_run.id))
+
     try:
         step = "ExtractingTopics"
         title = "Extracting query"
@@ -34,12 +505,7 @@ async def start_validation_pipeline(hypothesis_id: str, db: Session):
         await publish_update(hypothesis, step, title)
 
         # Execute the step
-        result = await extract_topic_terms(hypothesis.content)
-        hypothesis.extracted_topics = result["topics"]
-        hypothesis.extracted_terms = result["keywords"]
-        hypothesis.extracted_entities = result["named_entities"]
-        hypothesis.query_type = result["query_type"]
-        db.commit()
+        await _extract_query(hypothesis, db, pipeline_run)
 
         comment = f"Extracted topics: {hypothesis.extracted_topics}"
 
@@ -47,14 +513,9 @@ async def start_validation_pipeline(hypothesis_id: str, db: Session):
         await publish_update(hypothesis, step, title, comment=comment)
 
         # Check if query type is supported
-        if hypothesis.query_type == "factual":
-            await start_factual_pipeline(hypothesis, db)
-        elif hypothesis.query_type == "definitional":
-            await start_definitional_pipeline(hypothesis, db)
-        elif hypothesis.query_type == "research-based":
-            await start_academic_pipeline(hypothesis, db)
-        elif hypothesis.query_type == "abstract":
-            await start_abstract_pipeline(hypothesis, db)
+        start_pipeline = QUERY_PIPELINES.get(hypothesis.query_type)
+        if start_pipeline is not None:
+            await start_pipeline(hypothesis, db, pipeline_run)
         else:
             skip_msg = f"Skipped: Query type '{hypothesis.query_type}' not handled."
             logger.info(skip_msg)
@@ -69,7 +530,7 @@ async def start_validation_pipeline(hypothesis_id: str, db: Session):
         # academic pipeline also completed successfully. Mark completed.
         # NOTE: If the academic pipeline sets a different status (e.g. "Failed"),
         # we do not overwrite it. So we check here first.
-        if hypothesis.status not in ["Completed", "Failed", "Skipped"]:
+        if hypothesis.status not in FINAL_STATUSES:
             hypothesis.status = "Completed"
             db.commit()
 
@@ -86,7 +547,13 @@ async def start_validation_pipeline(hypothesis_id: str, db: Session):
         return
 
     finally:
+        heartbeat.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await heartbeat
+
         # Ensure final status isn't left in "Processing" if something got missed
-        if hypothesis.status not in ["Completed", "Failed", "Skipped"]:
+        if hypothesis.status not in FINAL_STATUSES:
             hypothesis.status = "Failed"
             db.commit()
+
+        crud_pipeline_runs.finish_run(db, pipeline_run, hypothesis.status)
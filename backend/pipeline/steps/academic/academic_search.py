@@ -1,22 +1,57 @@
+import asyncio
+import hashlib
 import json
 import logging
 import os
+import re
 import time
 from typing import List, Dict, Optional
-from datetime import datetime, timezone
 import httpx
-import dateutil.parser
-from db.models import Hypothesis
+from db.models import AcademicWork, Hypothesis
 from sqlalchemy.orm import Session
-from openai import OpenAI
-from crud.academic_works import create_academic_work
+from core.cache import MemoryCache, RedisCache, TieredCache
+from core.http import get_http_client, get_http_stats
+from core.llm import chat_completion
+from core.metrics import (
+    EXTERNAL_REQUEST_DURATION, EXTERNAL_REQUESTS, register_cache, tiered_cache_stats, track_duration
+)
+from core.tracing import span
+from core.rate_limit import TokenBucket, backoff_delay, parse_retry_after
+from messaging.redis import AsyncRedisClient
+from crud.academic_works import bulk_upsert_academic_works, get_academic_works_by_core_ids
 from schemas.academic_works import AcademicWorkCreate, AcademicWorkResponse
-
-client = OpenAI()
+from pipeline.steps.academic.ranking import get_embeddings
+from pipeline.steps.academic.vector_index import get_index
 
 logger = logging.getLogger(__name__)
 
 CORE_API_KEY = os.getenv("CORE_API_KEY")
+CORE_RATE_LIMIT_PER_MINUTE = float(os.getenv("CORE_RATE_LIMIT_PER_MINUTE", "10"))
+CORE_RATE_LIMIT_BURST = int(os.getenv("CORE_RATE_LIMIT_BURST", "5"))
+CORE_MAX_RETRIES = int(os.getenv("CORE_MAX_RETRIES", "5"))
+CORE_BACKOFF_BASE = float(os.getenv("CORE_BACKOFF_BASE", "1"))
+CORE_BACKOFF_MAX = float(os.getenv("CORE_BACKOFF_MAX", "60"))
+RATE_LIMIT_USE_REDIS = os.getenv("RATE_LIMIT_USE_REDIS", "False").lower() in ("true", "1")
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+LOCAL_SEARCH_ENABLED = os.getenv("LOCAL_SEARCH_ENABLED", "True").lower() in ("true", "1")
+LOCAL_SEARCH_MIN_SIMILARITY = float(os.getenv("LOCAL_SEARCH_MIN_SIMILARITY", "0.45"))
+LOCAL_SEARCH_MIN_HITS = int(os.getenv("LOCAL_SEARCH_MIN_HITS", "5"))
+
+core_rate_limiter = TokenBucket(
+    "core",
+    rate=CORE_RATE_LIMIT_PER_MINUTE / 60,
+    capacity=CORE_RATE_LIMIT_BURST,
+    redis=AsyncRedisClient().redis if RATE_LIMIT_USE_REDIS else None
+)
+
+# CORE ids of previous searches, keyed by normalised query and options
+search_cache = TieredCache(
+    MemoryCache(maxsize=SEARCH_CACHE_SIZE),
+    RedisCache(AsyncRedisClient().redis, prefix="core_search"),
+    ttl=SEARCH_CACHE_TTL
+)
+register_cache("core_search", tiered_cache_stats(search_cache))
 
 async def _build_search_query(hypothesis: Hypothesis, max_length: int = 80) -> str:
     """
@@ -41,7 +76,7 @@ async def _build_search_query(hypothesis: Hypothesis, max_length: int = 80) -> s
         "Output only the search query string, no extra text."
     )
 
-    response = client.chat.completions.create(
+    query = await chat_completion(
         model="gpt-4o",  # or "gpt-4o-mini", "gpt-3.5-turbo", etc.
         messages=[
             {"role": "system", "content": "You are a concise, factual assistant."},
@@ -50,8 +85,6 @@ async def _build_search_query(hypothesis: Hypothesis, max_length: int = 80) -> s
         temperature=0.0  # lower temperature => less creativity, more accuracy
     )
 
-    query = response.choices[0].message.content
-
     logger.info("[CORE] search query: %s", query)
 
     return query
@@ -75,40 +108,139 @@ async def _fetch_results(
         "limit": str(limit),
     })
     if exclude_text:
-        params["exclude"] = "fullText"
+        params = params.set("exclude", "fullText")
     if scroll:
-        params["scroll"] = "true"
+        params = params.set("scroll", "true")
     if scroll_id:
-        params["scrollId"] = scroll_id
+        params = params.set("scrollId", scroll_id)
 
-    async with httpx.AsyncClient(follow_redirects=True) as async_client:
-        while True:
+    async_client = get_http_client()
+    for attempt in range(CORE_MAX_RETRIES + 1):
+        await core_rate_limiter.acquire()
+        with span("core.search", {"core.attempt": attempt, "core.limit": limit}) as active, \
+                track_duration(EXTERNAL_REQUEST_DURATION, service="core"):
             response = await async_client.get(base_url, headers=headers, params=params)
+            if active is not None:
+                active.set_attribute("http.status_code", response.status_code)
+        EXTERNAL_REQUESTS.labels(service="core", status=str(response.status_code)).inc()
+
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == CORE_MAX_RETRIES:
+                break
 
-            # Handle 429 (rate limit)
+            delay = backoff_delay(attempt, CORE_BACKOFF_BASE, CORE_BACKOFF_MAX)
             if response.status_code == 429:
-                retry_after_str = response.headers.get("X-RateLimit-Retry-After")
-                if retry_after_str:
-                    retry_time = dateutil.parser.parse(retry_after_str)
-                    now_utc = datetime.now(timezone.utc)
-                    if retry_time > now_utc:
-                        sleep_secs = (retry_time - now_utc).seconds + 1
-                        time.sleep(sleep_secs)
-                        continue
-                else:
-                    time.sleep(5)
-                    continue
-            elif response.status_code >= 500:
+                # Rate limited: pause every pipeline sharing the limiter
+                retry_after = parse_retry_after(
+                    response.headers.get("X-RateLimit-Retry-After")
+                )
+                if retry_after is not None:
+                    delay = retry_after + 1
+                await core_rate_limiter.pause_until(time.time() + delay)
+            else:
                 # Server-side error
-                time.sleep(5)
-                continue
-            elif response.status_code != 200:
-                # Non-recoverable error
-                logger.error("[CORE] HTTP %s: %s", response.status_code, response.text)
-                response.raise_for_status()
+                await asyncio.sleep(delay)
+
+            logger.warning("[CORE] HTTP %s, retry %d/%d in %.1fs",
+                           response.status_code, attempt + 1, CORE_MAX_RETRIES, delay)
+            continue
+
+        if response.status_code != 200:
+            # Non-recoverable error
+            logger.error("[CORE] HTTP %s: %s", response.status_code, response.text)
+            response.raise_for_status()
+
+        logger.debug("[CORE] HTTP client stats: %s", get_http_stats())
+        data = response.json()
+        return data
+
+    logger.error("[CORE] Giving up after %d retries: HTTP %s",
+                 CORE_MAX_RETRIES, response.status_code)
+    response.raise_for_status()
 
-            data = response.json()
-            return data
+def _search_cache_key(query: str, limit: int, exclude_text: Optional[bool]) -> str:
+    """
+    Builds the search cache key from a normalised query and the search options.
+
+    Whitespace is collapsed and search terms are lower-cased, while the
+    boolean operators keep their case since CORE treats them as operators
+    only in upper case.
+    """
+    normalized = re.sub(r"\s+", " ", query.strip())
+    normalized = re.sub(
+        r"[^\s()\"]+",
+        lambda match: match.group(0) if match.group(0) in ("AND", "OR", "NOT")
+        else match.group(0).lower(),
+        normalized
+    )
+    key = json.dumps([normalized, limit, bool(exclude_text)])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+async def _search_local_corpus(
+        hypothesis: Hypothesis,
+        db: Session,
+        limit: int) -> List[Dict]:
+    """
+    Searches the stored academic works with the local vector index.
+
+    Returns:
+        List[Dict]: Up to `limit` works above LOCAL_SEARCH_MIN_SIMILARITY, best
+        first, or an empty list if fewer than LOCAL_SEARCH_MIN_HITS qualify.
+    """
+    index = await get_index()
+    if not index.ids:
+        return []
+
+    [query_embedding] = await get_embeddings([hypothesis.content], db)
+    hits = [
+        (work_id, similarity)
+        for work_id, similarity in index.search(query_embedding, limit)
+        if similarity >= LOCAL_SEARCH_MIN_SIMILARITY
+    ]
+    if len(hits) < min(LOCAL_SEARCH_MIN_HITS, limit):
+        return []
+
+    works = db.query(AcademicWork).filter(
+        AcademicWork.id.in_([work_id for work_id, _ in hits])
+    ).all()
+    works_by_id = {work.id: work for work in works}
+
+    return [
+        json.loads(AcademicWorkResponse.model_validate(works_by_id[work_id]).model_dump_json())
+        for work_id, _ in hits
+        if work_id in works_by_id
+    ]
+
+async def _search_local_corpus_or_core(
+        hypothesis: Hypothesis,
+        db: Session,
+        limit: int) -> List[Dict]:
+    """
+    Searches the local corpus, returning an empty list so that CORE is
+    searched instead when the index or the query embedding fails.
+    """
+    try:
+        return await _search_local_corpus(hypothesis, db, limit)
+    except Exception as e: # pylint: disable=broad-except
+        logger.warning("[LOCAL] Local corpus search failed, using CORE: %s", e)
+        return []
+
+async def _cached_search(cache_key: str, db: Session) -> Optional[List[Dict]]:
+    """
+    Returns the cached results of a CORE search, or None if the search is not
+    cached or some of its works are no longer stored.
+    """
+    cached_core_ids = await search_cache.get(cache_key)
+    if cached_core_ids is None:
+        return None
+
+    cached_works = get_academic_works_by_core_ids(db, cached_core_ids)
+    if len(cached_works) != len(cached_core_ids):
+        return None
+    return [
+        json.loads(AcademicWorkResponse.model_validate(work).model_dump_json())
+        for work in cached_works
+    ]
 
 async def perform_academic_search(
         hypothesis: Hypothesis,
@@ -117,8 +249,23 @@ async def perform_academic_search(
         exclude_fulltext: Optional[bool] = False) -> List[AcademicWorkResponse]:
     """
     High-level function to query the CORE API for open-access papers.
+    Stored works from the local corpus are used instead when enough of
+    them are relevant to the hypothesis.
     """
+    if LOCAL_SEARCH_ENABLED and db is not None:
+        local_results = await _search_local_corpus_or_core(hypothesis, db, overall_limit)
+        if local_results:
+            logger.info("[LOCAL] %d results found in local corpus", len(local_results))
+            return local_results
+
     query_str = await _build_search_query(hypothesis, max_length=80)
+
+    cache_key = _search_cache_key(query_str, overall_limit, exclude_fulltext)
+    cached_results = await _cached_search(cache_key, db)
+    if cached_results is not None:
+        logger.info("[CORE] search cache hit for query: %s", query_str)
+        return cached_results
+
     response_data = await _fetch_results(
         query_str,
         exclude_fulltext,
@@ -128,9 +275,10 @@ async def perform_academic_search(
 
     results = response_data.get("results", [])
     if not results:
+        await search_cache.set(cache_key, [])
         return []
 
-    parsed_results = []
+    academic_works = []
     used_titles = set()
 
     for item in results:
@@ -139,7 +287,7 @@ async def perform_academic_search(
             continue
 
         # Construct the academic work object
-        academic_work = AcademicWorkCreate(
+        academic_works.append(AcademicWorkCreate(
             abstract=item.get("abstract") or item.get("description", ""),
             authors=item.get("authors", []),
             links=item.get("links", []),
@@ -149,32 +297,14 @@ async def perform_academic_search(
             publisher=item.get("publisher", ""),
             title=title,
             year_published=str(item.get("yearPublished")) or None
-        )
-
-        # display_url = ""
-        # links = record.get("links", [])
-        # for link in links:
-        #     if link.get("type") == "display":
-        #         display_url = link.get("url", "")
-        #         break
-
-        # if not display_url:
-        #     # If we have a "downloadUrl" or something else, we could use it
-        #     display_url = record.get("downloadUrl", "")
-
-        # Create the academic work in the database
-        created_work = await create_academic_work(db, academic_work)
-
-        # Convert the created work into a dictionary if needed
-        if created_work:
-            # Assuming `created_work` is an object, convert to dict
-            created_work_response = AcademicWorkResponse.model_validate(created_work)
-            created_work_dict = json.loads(created_work_response.model_dump_json())
-            used_titles.add(title)
-            parsed_results.append(created_work_dict)
-
-        # Stop if we've reached the overall limit
-        if len(parsed_results) >= overall_limit:
-            break
-
-    return parsed_results
+        ))
+        used_titles.add(title)
+
+    # Ingest the whole page of results in a single transaction
+    created_works = bulk_upsert_academic_works(db, academic_works)[:overall_limit]
+    await search_cache.set(cache_key, [created_work.core_id for created_work in created_works])
+
+    return [
+        json.loads(AcademicWorkResponse.model_validate(created_work).model_dump_json())
+        for created_work in created_works
+    ]
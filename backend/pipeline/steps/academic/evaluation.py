@@ -3,9 +3,8 @@ import re
 import json
 from typing import Any, Dict, List
 from db.models import Hypothesis
-from openai import OpenAI, OpenAIError
-
-client = OpenAI()
+from openai import OpenAIError
+from core.llm import chat_completion
 
 logger = logging.getLogger(__name__)
 
@@ -78,7 +77,7 @@ async def _perform_llm_summarization(prompt: str) -> Dict[str, Any]:
     Uses one LLM prompt to extract an evaluation based on an 
     input prompt.
     """
-    response = client.chat.completions.create(
+    content = await chat_completion(
         model="gpt-4o",  # or "gpt-4o-mini", "gpt-3.5-turbo", etc.
         messages=[
             {
@@ -91,7 +90,6 @@ async def _perform_llm_summarization(prompt: str) -> Dict[str, Any]:
         temperature=0.0  # lower temperature => less creativity, more accuracy
     )
 
-    content = response.choices[0].message.content
     if content.startswith("```") and content.endswith("```"):
         content = content.split("\n", 1)[-1].rsplit("\n", 1)[0]
 
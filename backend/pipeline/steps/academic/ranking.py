@@ -1,103 +1,157 @@
 import asyncio
 import logging
-from typing import List, Dict
-from openai import OpenAI
+import os
+from typing import List, Dict, Optional
 import numpy as np
+from sqlalchemy.orm import Session
+from core.llm import create_embeddings, estimate_tokens, CHARS_PER_TOKEN
+from pipeline.utils.embedding_store import embedding_store
+from pipeline.utils.vectors import normalize_rows, top_k
 
-client = OpenAI()
 logger = logging.getLogger(__name__)
 
 EMBEDDING_MODEL = "text-embedding-3-large"  # or "text-embedding-3-small"
+EMBEDDING_MAX_INPUT_TOKENS = 8191  # per-input limit of the embedding models
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+EMBEDDING_BATCH_TOKEN_BUDGET = int(os.getenv("EMBEDDING_BATCH_TOKEN_BUDGET", "100000"))
 
 async def rank_search_results(
     hypothesis_text: str,
     search_results: List[Dict],
-    top_n: int = 10
+    top_n: int = 10,
+    db: Optional[Session] = None
 ) -> List[Dict]:
     """
-    Ranks the given search results based on their similarity 
+    Ranks the given search results based on their similarity
     to the hypothesis text using OpenAI embeddings (cosine similarity).
 
     Args:
         hypothesis_text (str): The text of the hypothesis to compare against.
         search_results (List[Dict]): A list of search-result dictionaries
-            (e.g., from academic_search) each containing fields like 'title', 
+            (e.g., from academic_search) each containing fields like 'title',
             'description', 'abstract', etc.
         top_n (int, optional): How many top results to return. Defaults to 10.
+        db (Optional[Session]): Database session for the persistent embedding
+            cache. Without it, only the in-process cache is used.
 
     Returns:
         List[Dict]: A list of the top N search results (sorted by descending similarity).
-                    Each dict is enriched with a "similarity" field 
+                    Each dict is enriched with a "similarity" field
                     for debugging or further processing.
     """
-    # Obtain an embedding for the hypothesis text
-    hypothesis_embedding = await _get_embedding_async(hypothesis_text)
-
-    # Embed each search result's text (title + description/abstract)
-    # In CORE, "description" is often the abstract or summary.
-    for result in search_results:
-        # Fallback to empty strings if not present
-        title = result.get("title") or ""
-        abstract = result.get("abstract")
-        combined_text = f"{title}\n{abstract}"
-
-        embedding_vec = await _get_embedding_async(combined_text)
-        result["embedding"] = embedding_vec
-
-    # Compute similarity for each result
-    for result in search_results:
-        emb = result.get("embedding")
-        if emb is None:
-            result["similarity"] = -999.0
-        else:
-            sim = _cosine_similarity(emb, hypothesis_embedding)
-            result["similarity"] = sim
-
-    # Sort by descending similarity
-    ranked_results = sorted(search_results, key=lambda x: x["similarity"], reverse=True)
-
-    # Return top N - exclude the embedding field
-    top_results = [
-        {k: v for k, v in result.items() if k != "embedding"}
-        for result in ranked_results[:top_n]
+    if not search_results:
+        return []
+
+    # Embed the hypothesis together with each search result's text
+    # (title + description/abstract). In CORE, "description" is often the
+    # abstract or summary.
+    texts = [hypothesis_text] + [
+        work_embedding_text(result.get("title"), result.get("abstract"))
+        for result in search_results
     ]
 
+    embeddings = await get_embeddings(texts, db)
+
+    # Score all results with one matrix-vector product over unit vectors
+    query = normalize_rows(embeddings[0][np.newaxis, :])[0]
+    matrix = normalize_rows(np.vstack(embeddings[1:]))
+    similarities = matrix @ query
+
+    # Return top N by descending similarity
+    top_results = []
+    for idx in top_k(similarities, top_n):
+        result = dict(search_results[idx])
+        result["similarity"] = float(similarities[idx])
+        top_results.append(result)
+
     return top_results
 
-async def _get_embedding_async(text: str) -> List[float]:
+def work_embedding_text(title: Optional[str], abstract: Optional[str]) -> str:
     """
-    Helper function to get an embedding from the OpenAI API asynchronously.
+    Builds the text embedded for an academic work (title + abstract).
 
-    Args:
-        text (str): The text input to be embedded.
+    The same text is used by the local vector index to find stored
+    embeddings, so both must be derived through this helper.
+    """
+    # Fallback to empty strings if not present
+    return _truncate_input(f"{title or ''}\n{abstract}")
 
-    Returns:
-        List[float]: The resulting embedding vector.
+def _truncate_input(text: str) -> str:
+    """Truncates a text to the embedding model's input limit."""
+    return text[:EMBEDDING_MAX_INPUT_TOKENS * CHARS_PER_TOKEN]
+
+async def get_embeddings(
+    texts: List[str],
+    db: Optional[Session] = None
+) -> List[np.ndarray]:
     """
-    response = await asyncio.to_thread(
-        client.embeddings.create,
-        model=EMBEDDING_MODEL,
-        input=text
-    )
-    
-    embedding_vec = response.data[0].embedding
-    return embedding_vec
+    Embeds all texts using the embedding cache and as few embedding
+    requests as possible.
+
+    Each text is truncated to the model's input limit. Texts missing from
+    the cache are split into batches that respect both the batch size and
+    the per-request token budget; batches are sent concurrently and the
+    results are written back to the cache.
 
+    Args:
+        texts (List[str]): The text inputs to be embedded.
+        db (Optional[Session]): Database session for the persistent cache.
 
-def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    Returns:
+        List[np.ndarray]: One float32 embedding vector per text, in input order.
+    """
+    texts = [_truncate_input(text) for text in texts]
+
+    embeddings, missing = embedding_store.get_many(EMBEDDING_MODEL, texts, db)
+
+    if missing:
+        missing_texts = [texts[idx] for idx in missing]
+        batches = _batch_inputs(
+            missing_texts, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_TOKEN_BUDGET
+        )
+        logger.info("Embedding %d of %d texts in %d request(s)",
+                    len(missing_texts), len(texts), len(batches))
+
+        responses = await asyncio.gather(*(
+            create_embeddings(batch, model=EMBEDDING_MODEL) for batch in batches
+        ))
+        vectors = [
+            np.asarray(embedding, dtype=np.float32)
+            for response in responses for embedding in response
+        ]
+        embedding_store.put_many(EMBEDDING_MODEL, missing_texts, vectors, db)
+        embeddings.update(zip(missing, vectors))
+
+    logger.info("Embedding cache stats: %s", embedding_store.stats())
+    return [embeddings[idx] for idx in range(len(texts))]
+
+def _batch_inputs(texts: List[str], max_size: int, token_budget: int) -> List[List[str]]:
     """
-    Computes cosine similarity between two embedding vectors.
+    Splits texts into consecutive batches capped by count and estimated tokens.
+
+    A single text exceeding the token budget is placed in a batch of its own.
 
     Args:
-        a (List[float]): First embedding vector
-        b (List[float]): Second embedding vector
+        texts (List[str]): The texts to batch, in order.
+        max_size (int): Maximum number of texts per batch.
+        token_budget (int): Maximum estimated tokens per batch.
 
     Returns:
-        float: Cosine similarity between the two vectors
+        List[List[str]]: The batches, preserving input order.
     """
-    a_np = np.array(a, dtype=np.float32)
-    b_np = np.array(b, dtype=np.float32)
-    denom = (np.linalg.norm(a_np) * np.linalg.norm(b_np))
-    if denom == 0.0:
-        return 0.0
-    return float(np.dot(a_np, b_np) / denom)
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_size or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
@@ -1,16 +1,19 @@
 import asyncio
 import json
-from concurrent.futures import ThreadPoolExecutor
 import logging
+import os
 from typing import Any, Dict, List
 from db.models import AcademicWork
-from openai import OpenAI, OpenAIError
+from openai import OpenAIError
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from core.llm import chat_completion
 
-client = OpenAI()
 logger = logging.getLogger(__name__)
 
+SUMMARIZATION_CONCURRENCY = int(os.getenv("SUMMARIZATION_CONCURRENCY", "6"))
+
 async def _perform_llm_summarization(abstract: str) -> dict:
     """
     Uses one LLM prompt to extract a summary for a research paper's abstract.
@@ -26,7 +29,7 @@ async def _perform_llm_summarization(abstract: str) -> dict:
         }
     """
     try:
-        response = client.chat.completions.create(
+        content = await chat_completion(
             model="gpt-4o",
             messages=[
                 {
@@ -50,7 +53,6 @@ async def _perform_llm_summarization(abstract: str) -> dict:
                 {"role": "user", "content": abstract},
             ],
         )
-        content = response.choices[0].message.content
 
         if content.startswith("```") and content.endswith("```"):
             content = content.split("\n", 1)[-1].rsplit("\n", 1)[0]
@@ -59,64 +61,92 @@ async def _perform_llm_summarization(abstract: str) -> dict:
 
     except (OpenAIError, json.JSONDecodeError) as e:
         logger.error("Error during LLM summarization: %s", e)
-        # Fallback
+        # Fallback: an empty completion, which is neither used nor stored
         parsed = {
-            "summary": e,
-            "phase": "",
+            "summary": "",
+            "phrase": "",
             "topics": []
         }
     
     return parsed
 
-def _get_existing_completion(session: Session, academic_work_id: str) -> tuple:
+def _get_existing_completions(session: Session, academic_work_ids: List[str]) -> Dict[str, tuple]:
     """
-    Check if an LLM summary exists for a given AcademicWork ID in the database.
+    Load the stored LLM completions for several AcademicWork IDs in one query.
 
     Args:
         session (Session): The database session.
-        academic_work_id (str): The ID of the AcademicWork to check.
+        academic_work_ids (List[str]): The IDs of the AcademicWorks to check.
 
     Returns:
-        str: The existing summary or None if not found.
+        Dict[str, tuple]: (llm_summary, llm_phrase, llm_keywords) per found ID.
     """
+    if not academic_work_ids:
+        return {}
+
     try:
-        academic_work = session.query(AcademicWork).filter_by(id=academic_work_id).first()
-        return (
-            academic_work.llm_summary,
-            academic_work.llm_phrase,
-            academic_work.llm_keywords
-        ) if academic_work else None
+        rows = session.query(
+            AcademicWork.id,
+            AcademicWork.llm_summary,
+            AcademicWork.llm_phrase,
+            AcademicWork.llm_keywords
+        ).filter(AcademicWork.id.in_(academic_work_ids)).all()
+        return {row.id: (row.llm_summary, row.llm_phrase, row.llm_keywords) for row in rows}
     except SQLAlchemyError as e:
-        logger.error("Error checking llm_summary for ID %s: %s", academic_work_id, e)
+        logger.error("Error checking llm_summary for IDs %s: %s", academic_work_ids, e)
         raise
 
-def _update_llm_summary(session: Session, academic_work_id: str, completion: dict) -> None:
+def _update_llm_summaries(session: Session, completions: Dict[str, dict]) -> None:
     """
-    Update the llm_summary column for a given AcademicWork object.
+    Update the LLM summary columns for several AcademicWork objects with one
+    bulk UPDATE statement.
 
     Args:
         session (Session): The database session.
-        academic_work_id (str): The ID of the AcademicWork to update.
-        summary (str): The summary to save in the llm_summary column.
+        completions (Dict[str, dict]): LLM completions keyed by AcademicWork ID.
 
     Returns:
         None
     """
     try:
-        academic_work = session.query(AcademicWork).filter_by(id=academic_work_id).first()
-        if academic_work:
-            academic_work.llm_summary = completion["summary"]
-            academic_work.llm_phrase = completion["phrase"]
-            academic_work.llm_keywords = completion["topics"]
-            session.commit()
-            logger.info("Updated llm_summary for AcademicWork ID: %s", academic_work_id)
-        else:
-            logger.warning("AcademicWork ID %s not found.", academic_work_id)
+        session.execute(update(AcademicWork), [
+            {
+                "id": academic_work_id,
+                "llm_summary": completion["summary"],
+                "llm_phrase": completion["phrase"],
+                "llm_keywords": completion["topics"],
+            }
+            for academic_work_id, completion in completions.items()
+        ])
+        session.commit()
+        logger.info("Updated llm_summary for %d AcademicWork(s)", len(completions))
     except SQLAlchemyError as e:
-        logger.error("Error updating llm_summary for ID %s: %s", academic_work_id, e)
+        logger.error("Error updating llm_summary for IDs %s: %s", list(completions), e)
         session.rollback()
         raise
 
+async def _summarize_concurrently(texts: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Run LLM summarizations concurrently, at most SUMMARIZATION_CONCURRENCY at a time.
+
+    Args:
+        texts (Dict[str, str]): Texts to summarize keyed by AcademicWork ID.
+
+    Returns:
+        Dict[str, Any]: The completion, or the raised exception, per AcademicWork ID.
+    """
+    semaphore = asyncio.Semaphore(SUMMARIZATION_CONCURRENCY)
+
+    async def _summarize(text: str) -> dict:
+        async with semaphore:
+            return await _perform_llm_summarization(text)
+
+    completions = await asyncio.gather(
+        *(_summarize(text) for text in texts.values()),
+        return_exceptions=True
+    )
+    return dict(zip(texts, completions))
+
 async def summarize_abstracts(
         search_results: List[Dict[str, Any]],
         session: Session
@@ -124,6 +154,10 @@ async def summarize_abstracts(
     """
     Summarize the abstracts of academic search results and update the database.
 
+    Stored summaries are loaded in one query. Papers without a stored summary
+    are summarized concurrently and the new summaries are written back with
+    a single bulk update.
+
     Args:
         search_results (List[Dict[str, Any]]): A list of search results 
         containing titles and abstracts.
@@ -133,6 +167,12 @@ async def summarize_abstracts(
         Dict[str, Any]: A dictionary summarizing the results.
     """
     summaries_map = {}
+    pending_texts = {}
+
+    # Load the stored summaries of all candidate papers up front
+    existing_completions = _get_existing_completions(
+        session, [result["id"] for result in search_results if result.get("id")]
+    )
 
     for result in search_results:
         title = result.get("title", "No title available")
@@ -147,7 +187,7 @@ async def summarize_abstracts(
         logger.info("Processing abstract for paper: %s", title)
 
         # Check for existing summary in the database
-        existing_completion = _get_existing_completion(session, academic_work_id)
+        existing_completion = existing_completions.get(academic_work_id)
         if existing_completion and all(existing_completion):
             logger.info("Using existing summary for AcademicWork ID: %s", academic_work_id)
             summaries_map[academic_work_id] = {
@@ -156,19 +196,33 @@ async def summarize_abstracts(
                 "topics": existing_completion[2]    # llm_keywords
             }
         else:
-            try:
-                # Perform LLM summarization
-                completion = await _perform_llm_summarization(combined_text)
-                summaries_map[academic_work_id] = completion
-
-                # Update the summary in the database using ThreadPoolExecutor
-                with ThreadPoolExecutor() as executor:
-                    await asyncio.get_running_loop().run_in_executor(
-                        executor, _update_llm_summary, session, academic_work_id, completion
-                    )
-            except (RuntimeError, SQLAlchemyError, OpenAIError) as e:
-                logger.error("Failed to summarize or update \
-                             AcademicWork ID %s: %s", academic_work_id, e)
+            pending_texts[academic_work_id] = combined_text
+
+    # Perform LLM summarization for all papers without a stored summary
+    new_completions = {}
+    completions = await _summarize_concurrently(pending_texts)
+    for academic_work_id, completion in completions.items():
+        if isinstance(completion, (RuntimeError, OpenAIError)):
+            logger.error("Failed to summarize AcademicWork ID %s: %s", academic_work_id, completion)
+            continue
+        if isinstance(completion, BaseException):
+            raise completion
+
+        # Fallbacks from failed or incomplete completions are neither used nor persisted
+        if not all(completion.get(key) for key in ("summary", "phrase", "topics")):
+            logger.warning("Incomplete summary for AcademicWork ID %s", academic_work_id)
+            continue
+
+        summaries_map[academic_work_id] = completion
+        new_completions[academic_work_id] = completion
+
+    # Update the summaries in the database in one batch
+    if new_completions:
+        try:
+            _update_llm_summaries(session, new_completions)
+        except SQLAlchemyError as e:
+            logger.error("Failed to update summaries for \
+                         AcademicWork IDs %s: %s", list(new_completions), e)
 
     # Enrich search_results with summaries
     for result in search_results:
@@ -179,4 +233,3 @@ async def summarize_abstracts(
             result["keywords"] = summaries_map[academic_work_id]["topics"]
 
     return search_results
-
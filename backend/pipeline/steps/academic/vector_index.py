@@ -0,0 +1,275 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from crud import embeddings as crud_embeddings
+from db.database import SessionLocal
+from db.models import AcademicWork
+from pipeline.steps.academic.ranking import EMBEDDING_MODEL, work_embedding_text
+from pipeline.utils.embedding_store import text_hash
+from pipeline.utils.vectors import normalize_rows, top_k
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_DIR = os.getenv(
+    "VECTOR_INDEX_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "data", "vector_index")
+)
+VECTOR_INDEX_TTL = int(os.getenv("VECTOR_INDEX_TTL", "3600"))  # seconds before a rebuild
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+IVF_MIN_SIZE = 4096  # below this size a flat scan is faster than probing lists
+LOOKUP_CHUNK_SIZE = 1000
+
+class VectorIndex:
+    """
+    Approximate nearest-neighbour index over academic work embeddings.
+
+    Small corpora are searched exhaustively. Larger ones are partitioned
+    into inverted lists (IVF) around spherical k-means centroids, and only
+    the `nprobe` lists closest to the query are scanned. Vectors are stored
+    unit-normalised, ordered by list, so that each list is a contiguous slice.
+
+    Attributes:
+        ids (List[str]): AcademicWork IDs, one per vector row.
+        vectors (np.ndarray): Normalised float32 vectors (possibly memory-mapped).
+        centroids (Optional[np.ndarray]): List centroids, or None for a flat index.
+        offsets (Optional[np.ndarray]): Row offsets of each list, length nlist + 1.
+    """
+
+    def __init__(
+            self,
+            ids: List[str],
+            vectors: np.ndarray,
+            centroids: Optional[np.ndarray] = None,
+            offsets: Optional[np.ndarray] = None
+    ):
+        self.ids = ids
+        self.vectors = vectors
+        self.centroids = centroids
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids: List[str], vectors: np.ndarray) -> "VectorIndex":
+        """
+        Builds an index from raw embedding vectors.
+
+        Args:
+            ids (List[str]): AcademicWork IDs, one per vector.
+            vectors (np.ndarray): A 2-D array of embedding vectors.
+
+        Returns:
+            VectorIndex: A flat index for small inputs, an IVF index otherwise.
+        """
+        vectors = normalize_rows(vectors)
+        if len(ids) < IVF_MIN_SIZE:
+            return cls(ids, vectors)
+
+        nlist = int(np.sqrt(len(ids)))
+        centroids = _train_centroids(vectors, nlist)
+        assignments = _assign(vectors, centroids)
+
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(nlist + 1))
+        return cls(
+            [ids[idx] for idx in order],
+            np.ascontiguousarray(vectors[order]),
+            centroids,
+            offsets
+        )
+
+    def search(
+            self,
+            query: np.ndarray,
+            k: int,
+            nprobe: int = VECTOR_INDEX_NPROBE
+    ) -> List[Tuple[str, float]]:
+        """
+        Finds the k vectors most similar to the query.
+
+        Args:
+            query (np.ndarray): The query embedding.
+            k (int): The number of neighbours to return.
+            nprobe (int): The number of inverted lists to scan (IVF only).
+
+        Returns:
+            List[Tuple[str, float]]: (AcademicWork ID, cosine similarity) pairs,
+            best first.
+        """
+        if not self.ids:
+            return []
+
+        query = normalize_rows(query[np.newaxis, :])[0]
+
+        if self.centroids is None:
+            rows = None
+            scores = self.vectors @ query
+        else:
+            probes = top_k(self.centroids @ query, nprobe)
+            rows = np.concatenate([
+                np.arange(self.offsets[probe], self.offsets[probe + 1]) for probe in probes
+            ])
+            scores = self.vectors[rows] @ query
+
+        hits = []
+        for idx in top_k(scores, k):
+            row = idx if rows is None else rows[idx]
+            hits.append((self.ids[row], float(scores[idx])))
+        return hits
+
+    def save(self, directory: str) -> None:
+        """
+        Persists the index files, replacing any previous index in the directory.
+
+        The files are written to a temporary directory of their own and then
+        swapped in, so processes saving at the same time never mix their
+        files. If another process publishes its index first, that one is kept.
+        """
+        parent, name = os.path.split(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_directory = tempfile.mkdtemp(prefix=f"{name}.", suffix=".tmp", dir=parent)
+
+        np.save(os.path.join(tmp_directory, "vectors.npy"), self.vectors)
+        if self.centroids is not None:
+            np.save(os.path.join(tmp_directory, "centroids.npy"), self.centroids)
+            np.save(os.path.join(tmp_directory, "offsets.npy"), self.offsets)
+        with open(os.path.join(tmp_directory, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(self.ids, f)
+
+        # A non-empty directory cannot be replaced, so move the old one aside first
+        old_directory = tempfile.mkdtemp(prefix=f"{name}.", suffix=".old", dir=parent)
+        try:
+            os.replace(directory, old_directory)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(tmp_directory, directory)
+        except OSError:
+            logger.info("Vector index in %s was replaced concurrently, keeping it", directory)
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+        shutil.rmtree(old_directory, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str) -> "VectorIndex":
+        """Loads a persisted index, memory-mapping its vectors."""
+        with open(os.path.join(directory, "ids.json"), encoding="utf-8") as f:
+            ids = json.load(f)
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        if len(vectors) != len(ids):
+            raise ValueError(f"{directory} holds {len(ids)} IDs but {len(vectors)} vectors")
+
+        centroids = offsets = None
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            centroids = np.load(centroids_path)
+            offsets = np.load(os.path.join(directory, "offsets.npy"))
+        return cls(ids, vectors, centroids, offsets)
+
+def _train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 10) -> np.ndarray:
+    """Trains list centroids with spherical k-means on a sample of the vectors."""
+    rng = np.random.default_rng(0)
+    sample_size = min(len(vectors), nlist * 64)
+    sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, size=nlist, replace=False)]
+
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    """Assigns each vector to its most similar centroid."""
+    return np.concatenate([
+        np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), chunk_size)
+    ])
+
+async def build_index_from_db(
+        session_factory: Callable[[], Session] = SessionLocal
+) -> VectorIndex:
+    """
+    Builds an index over every academic work with a cached embedding.
+
+    Works whose title+abstract has not been embedded yet are skipped; they
+    are picked up by a later rebuild once the ranking step has embedded them.
+    The database scan, hashing and clustering run in a worker thread with
+    a session of their own, so a rebuild does not block the event loop.
+    """
+    return await asyncio.to_thread(_build_index, session_factory)
+
+def _build_index(session_factory: Callable[[], Session]) -> VectorIndex:
+    with session_factory() as db:
+        return _build_index_from_session(db)
+
+def _build_index_from_session(db: Session) -> VectorIndex:
+    works = db.query(AcademicWork.id, AcademicWork.title, AcademicWork.abstract).all()
+    hashes = [text_hash(work_embedding_text(work.title, work.abstract)) for work in works]
+
+    stored = {}
+    for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+        stored.update(crud_embeddings.get_embeddings(
+            db, EMBEDDING_MODEL, hashes[start:start + LOOKUP_CHUNK_SIZE]
+        ))
+
+    ids, vectors = [], []
+    for work, hashed in zip(works, hashes):
+        embedding = stored.get(hashed)
+        if embedding is not None:
+            ids.append(work.id)
+            vectors.append(np.frombuffer(embedding.vector, dtype=np.float32))
+
+    if not ids:
+        return VectorIndex([], np.empty((0, 0), dtype=np.float32))
+    return VectorIndex.build(ids, np.vstack(vectors))
+
+_index: Optional[VectorIndex] = None
+_loaded_at: float = 0.0
+_index_lock = asyncio.Lock()
+
+async def get_index() -> VectorIndex:
+    """
+    Returns the process-wide index, loading or rebuilding it when stale.
+
+    A persisted index younger than VECTOR_INDEX_TTL is memory-mapped from
+    disk; otherwise the index is rebuilt from the database and persisted
+    for other workers. The lock only serialises rebuilds within this
+    process; concurrent saves from other processes are safe but not shared.
+    """
+    global _index, _loaded_at # pylint: disable=W0603
+    async with _index_lock:
+        now = time.time()
+        if _index is not None and now - _loaded_at < VECTOR_INDEX_TTL:
+            return _index
+
+        ids_path = os.path.join(VECTOR_INDEX_DIR, "ids.json")
+        if os.path.exists(ids_path) and now - os.path.getmtime(ids_path) < VECTOR_INDEX_TTL:
+            try:
+                _index = VectorIndex.load(VECTOR_INDEX_DIR)
+                _loaded_at = now
+                return _index
+            except (OSError, ValueError) as e:
+                logger.warning("Could not load vector index, rebuilding: %s", e)
+
+        started = time.perf_counter()
+        _index = await build_index_from_db()
+        try:
+            await asyncio.to_thread(_index.save, VECTOR_INDEX_DIR)
+        except OSError as e:
+            logger.warning("Could not persist vector index: %s", e)
+        _loaded_at = now
+        logger.info("Built vector index over %d works in %.2fs",
+                    len(_index), time.perf_counter() - started)
+        return _index
@@ -1,7 +1,5 @@
 import json
-from openai import OpenAI
-
-client = OpenAI()
+from core.llm import chat_completion
 
 async def extract_topic_terms(text: str) -> dict:
     """
@@ -32,7 +30,7 @@ async def extract_topic_terms(text: str) -> dict:
       "query_type": "factual/definitional/research-based/abstract/subjective/unknown"
     }}
     """
-    response = client.chat.completions.create(
+    content = await chat_completion(
         model="gpt-4o",
         messages=[
             {"role": "system", "content": "You are a concise, factual assistant."},
@@ -41,8 +39,6 @@ async def extract_topic_terms(text: str) -> dict:
         temperature=0.0
     )
 
-    content = response.choices[0].message.content
-
     if content.startswith("```") and content.endswith("```"):
         content = content.split("\n", 1)[-1].rsplit("\n", 1)[0]
     
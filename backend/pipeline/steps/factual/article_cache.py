@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from core.metrics import register_cache
+from crud import wikipedia_articles as crud_articles
+from db.models import WikipediaArticle
+from pipeline.steps.factual.wiki_client import fetch_page_info, fetch_page_text
+
+logger = logging.getLogger(__name__)
+
+WIKI_CACHE_MAX_ARTICLES = int(os.getenv("WIKI_CACHE_MAX_ARTICLES", "5000"))
+# Cached articles verified more recently than this are served without any request
+WIKI_CACHE_REVALIDATE_AFTER = int(os.getenv("WIKI_CACHE_REVALIDATE_AFTER", "3600"))
+
+_stats = {"hits": 0, "revalidated": 0, "downloads": 0}
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _to_dict(article: WikipediaArticle) -> Dict:
+    return {
+        "title": article.title,
+        "summary": article.summary,
+        "url": article.url,
+        "text": article.text,
+        "revision_id": article.revision_id,
+    }
+
+def _lookup(db: Session, titles: List[str]) -> Dict[str, WikipediaArticle]:
+    try:
+        return crud_articles.get_wikipedia_articles(db, titles)
+    except SQLAlchemyError as e:
+        logger.error("Error reading cached Wikipedia articles: %s", e)
+        db.rollback()
+        return {}
+
+async def _revalidate(
+        titles: List[str],
+        cached: Dict[str, WikipediaArticle],
+        db: Session,
+        articles: Dict[str, Dict]
+) -> Tuple[List[str], List[Dict]]:
+    """
+    Checks the current revisions of articles with one batched request and
+    serves the cached articles whose revision is unchanged.
+
+    Returns:
+        Tuple[List[str], List[Dict]]: The titles of the revalidated articles,
+        and the page info of the articles to download.
+    """
+    page_info = await fetch_page_info(titles) if titles else []
+
+    # Redirects resolve to titles that may be cached under their own name
+    cached.update(_lookup(db, [
+        page["title"] for page in page_info if page["title"] not in cached
+    ]))
+
+    revalidated, outdated = [], []
+    for page in page_info:
+        article = cached.get(page["title"])
+        if article is not None and article.revision_id == page["revision_id"]:
+            articles[page["requested_title"]] = _to_dict(article)
+            revalidated.append(page["title"])
+        else:
+            outdated.append(page)
+    return revalidated, outdated
+
+async def _download(outdated: List[Dict], articles: Dict[str, Dict]) -> List[Dict]:
+    """Downloads the full text of new and changed articles."""
+    texts = await asyncio.gather(*(fetch_page_text(page["page_id"]) for page in outdated))
+    downloaded = [{**page, "text": text} for page, text in zip(outdated, texts)]
+    for article in downloaded:
+        articles[article["requested_title"]] = {
+            key: article[key] for key in ("title", "summary", "url", "text", "revision_id")
+        }
+    return downloaded
+
+def _update_cache(
+        db: Session,
+        fresh: List[str],
+        revalidated: List[str],
+        downloaded: List[Dict],
+        now: datetime
+):
+    """Records the accessed and verified articles and stores the downloaded ones."""
+    try:
+        crud_articles.touch_wikipedia_articles(db, fresh, now)
+        crud_articles.touch_wikipedia_articles(db, revalidated, now, verified=True)
+        # Deduplicate titles that several requested titles redirected to
+        crud_articles.upsert_wikipedia_articles(
+            db, list({article["title"]: article for article in downloaded}.values()), now
+        )
+        if downloaded:
+            crud_articles.evict_wikipedia_articles(db, WIKI_CACHE_MAX_ARTICLES)
+    except SQLAlchemyError as e:
+        logger.error("Error updating the Wikipedia article cache: %s", e)
+        db.rollback()
+
+async def get_articles(titles: List[str], db: Session) -> List[Dict]:
+    """
+    Returns Wikipedia articles, serving unchanged articles from the local cache.
+
+    Articles verified within WIKI_CACHE_REVALIDATE_AFTER are served without
+    contacting Wikipedia. The others are revalidated with one batched
+    request for their current revision ids; only articles that are new or
+    have a newer revision are downloaded in full. The cache is bounded to
+    WIKI_CACHE_MAX_ARTICLES, evicting the least recently accessed articles.
+
+    Args:
+        titles (List[str]): The article titles to fetch.
+        db (Session): Database session for the article cache.
+
+    Returns:
+        List[Dict]: One dict per existing article with "title", "summary",
+        "url", "text" and "revision_id", in the order of `titles`.
+    """
+    now = datetime.now(timezone.utc)
+    verified_after = now - timedelta(seconds=WIKI_CACHE_REVALIDATE_AFTER)
+    cached = _lookup(db, titles)
+
+    articles: Dict[str, Dict] = {}
+    fresh, unverified = [], []
+    for title in titles:
+        article = cached.get(title)
+        if article is not None and _as_utc(article.date_verified) > verified_after:
+            articles[title] = _to_dict(article)
+            fresh.append(title)
+        else:
+            unverified.append(title)
+
+    revalidated, outdated = await _revalidate(unverified, cached, db, articles)
+    downloaded = await _download(outdated, articles)
+
+    _stats["hits"] += len(fresh)
+    _stats["revalidated"] += len(revalidated)
+    _stats["downloads"] += len(downloaded)
+    _update_cache(db, fresh, revalidated, downloaded, now)
+
+    results, seen = [], set()
+    for title in titles:
+        article = articles.get(title)
+        if article is not None and article["title"] not in seen:
+            seen.add(article["title"])
+            results.append(article)
+    return results
+
+def get_article_cache_stats() -> Dict[str, int]:
+    """
+    Returns counters of articles served from the cache without a request,
+    served after a revision check, and downloaded in full.
+    """
+    return dict(_stats)
+
+# A fresh article is a hit of the cache; a revalidated one is a hit after a revision check
+register_cache("wikipedia_articles", lambda: [
+    ("fresh", _stats["hits"], _stats["revalidated"] + _stats["downloads"]),
+    ("revalidated", _stats["revalidated"], _stats["downloads"]),
+])
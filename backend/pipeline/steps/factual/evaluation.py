@@ -1,9 +1,9 @@
 import json
 from typing import Any, Dict, List
-from openai import OpenAI, OpenAIError
+from openai import OpenAIError
+from core.llm import chat_completion
 from db.models import Hypothesis
-
-client = OpenAI()
+from pipeline.steps.factual.passages import select_passages
 
 
 async def _prepare_prompt(hypothesis_content: str, search_results: List[Dict[str, Any]]) -> str:
@@ -18,8 +18,11 @@ async def _prepare_prompt(hypothesis_content: str, search_results: List[Dict[str
             or remain inconclusive about this claim."
     )
 
-    # Papers context
-    papers = f"Below are the relevant articles:\n\n{search_results}"
+    # Articles context, trimmed to the passages most relevant to the claim
+    passages = select_passages(hypothesis_content, search_results)
+    papers = "Below are the relevant passages from the articles:\n\n" + "\n\n".join(
+        f"[{passage['source']}] {passage['title']}\n{passage['text']}" for passage in passages
+    )
 
     # Instructions for final output
     instructions = (
@@ -56,7 +59,7 @@ async def _perform_llm_summarization(prompt: str) -> Dict[str, Any]:
     Uses one LLM prompt to extract an evaluation based on an 
     input prompt.
     """
-    response = client.chat.completions.create(
+    content = await chat_completion(
         model="gpt-4o",  # or "gpt-4o-mini", "gpt-3.5-turbo", etc.
         messages=[
             {
@@ -69,7 +72,6 @@ async def _perform_llm_summarization(prompt: str) -> Dict[str, Any]:
         temperature=0.0  # lower temperature => less creativity, more accuracy
     )
 
-    content = response.choices[0].message.content
     if content.startswith("```") and content.endswith("```"):
         content = content.split("\n", 1)[-1].rsplit("\n", 1)[0]
 
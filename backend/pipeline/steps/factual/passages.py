@@ -0,0 +1,129 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List
+from core.llm import estimate_tokens
+
+FACTUAL_CONTEXT_TOKEN_BUDGET = int(os.getenv("FACTUAL_CONTEXT_TOKEN_BUDGET", "3000"))
+PASSAGE_MAX_CHARS = int(os.getenv("PASSAGE_MAX_CHARS", "1000"))
+
+# BM25 parameters: term frequency saturation and document length normalisation
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which with".split()
+)
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercases a text and splits it into words, dropping stopwords."""
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOPWORDS]
+
+def chunk_text(text: str, max_chars: int = PASSAGE_MAX_CHARS) -> List[str]:
+    """
+    Splits an article into passages of at most `max_chars` characters.
+
+    Consecutive short paragraphs are merged; paragraphs that are too long
+    are split between sentences, or hard-split if a sentence is too long.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n+", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            pieces.extend(
+                sentence[start:start + max_chars] for start in range(0, len(sentence), max_chars)
+            )
+
+    passages, current = [], ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current} {piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+def bm25_scores(query: str, passages: List[str]) -> List[float]:
+    """
+    Scores passages against a query with Okapi BM25.
+
+    Document frequencies are computed over the given passages only, which
+    is enough to rank passages of a handful of articles against each other.
+    """
+    query_terms = set(_tokenize(query))
+    documents = [Counter(_tokenize(passage)) for passage in passages]
+    if not query_terms or not documents:
+        return [0.0] * len(passages)
+
+    average_length = sum(sum(doc.values()) for doc in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for doc in documents for term in query_terms if term in doc)
+
+    scores = []
+    for doc in documents:
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = doc.get(term, 0)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (
+                frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            )
+        scores.append(score)
+    return scores
+
+def select_passages(
+        claim: str,
+        articles: List[Dict[str, Any]],
+        token_budget: int = FACTUAL_CONTEXT_TOKEN_BUDGET
+) -> List[Dict[str, Any]]:
+    """
+    Picks the article passages most relevant to a claim within a token budget.
+
+    Args:
+        claim (str): The claim being evaluated.
+        articles (List[Dict[str, Any]]): Articles with "title" and "text"
+            (or only "summary" when no text is available).
+        token_budget (int): The estimated number of tokens the passages may use.
+
+    Returns:
+        List[Dict[str, Any]]: Passages with "source" (1-based article index),
+        "title", "position" and "text", in article and reading order.
+    """
+    candidates = []
+    for source, article in enumerate(articles, start=1):
+        text = article.get("text") or article.get("summary") or ""
+        for position, passage in enumerate(chunk_text(text)):
+            candidates.append({
+                "source": source,
+                "title": article.get("title", "No Title"),
+                "position": position,
+                "text": passage,
+            })
+
+    scores = bm25_scores(claim, [candidate["text"] for candidate in candidates])
+
+    # Earlier passages win ties, so the article introductions are preferred
+    ranked = sorted(
+        zip(scores, candidates),
+        key=lambda pair: (-pair[0], pair[1]["position"], pair[1]["source"])
+    )
+
+    selected, remaining = [], token_budget
+    for _, candidate in ranked:
+        tokens = estimate_tokens(candidate["text"])
+        if tokens <= remaining:
+            selected.append(candidate)
+            remaining -= tokens
+
+    return sorted(selected, key=lambda passage: (passage["source"], passage["position"]))
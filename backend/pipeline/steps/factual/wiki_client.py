@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List
+from core.http import get_http_client
+from core.metrics import EXTERNAL_REQUEST_DURATION, EXTERNAL_REQUESTS, track_duration
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+WIKI_LANG = "en"  # Use English Wikipedia
+WIKI_API_URL = f"https://{WIKI_LANG}.wikipedia.org/w/api.php"
+WIKI_USER_AGENT = os.getenv("WIKI_USER_AGENT", "wikipedia-search")
+
+async def _query(params: Dict[str, str]) -> Dict:
+    """
+    Sends a MediaWiki action=query request through the shared HTTP client.
+    """
+    attributes = {"wikipedia." + key: params[key] for key in ("list", "prop") if key in params}
+    with span("wikipedia.query", attributes) as active, \
+            track_duration(EXTERNAL_REQUEST_DURATION, service="wikipedia"):
+        response = await get_http_client().get(
+            WIKI_API_URL,
+            params={"action": "query", "format": "json", "formatversion": "2", **params},
+            headers={"User-Agent": WIKI_USER_AGENT},
+        )
+        if active is not None:
+            active.set_attribute("http.status_code", response.status_code)
+    EXTERNAL_REQUESTS.labels(service="wikipedia", status=str(response.status_code)).inc()
+    response.raise_for_status()
+    return response.json().get("query", {})
+
+async def search_titles(query: str, limit: int) -> List[str]:
+    """
+    Searches Wikipedia and returns the titles of the best matching articles.
+
+    Args:
+        query (str): The search query.
+        limit (int): The maximum number of titles to return.
+
+    Returns:
+        List[str]: Matching article titles, best first.
+    """
+    data = await _query({
+        "list": "search",
+        "srsearch": query,
+        "srlimit": str(limit),
+        "srprop": "",
+    })
+    return [result["title"] for result in data.get("search", [])]
+
+async def fetch_page_info(titles: List[str]) -> List[Dict]:
+    """
+    Fetches the summary, URL and revision of several articles in one request.
+
+    Redirects are followed and missing articles are skipped.
+
+    Args:
+        titles (List[str]): The article titles to fetch.
+
+    Returns:
+        List[Dict]: One dict per existing article with "requested_title",
+        "title", "summary", "url", "page_id" and "revision_id", in the order
+        of `titles`.
+    """
+    if not titles:
+        return []
+
+    data = await _query({
+        "titles": "|".join(titles),
+        "prop": "extracts|info",
+        "inprop": "url",
+        "exintro": "1",
+        "explaintext": "1",
+        "exlimit": "max",
+        "redirects": "1",
+    })
+
+    # Map each requested title to the title of the page it resolved to
+    resolved = {title: title for title in titles}
+    for mapping in data.get("normalized", []) + data.get("redirects", []):
+        for title, target in resolved.items():
+            if target == mapping["from"]:
+                resolved[title] = mapping["to"]
+
+    pages = {
+        page["title"]: page
+        for page in data.get("pages", [])
+        if not page.get("missing") and not page.get("invalid")
+    }
+
+    page_info = []
+    for title in titles:
+        page = pages.pop(resolved[title], None)
+        if page is None:
+            continue
+        page_info.append({
+            "requested_title": title,
+            "title": page["title"],
+            "summary": page.get("extract", ""),
+            "url": page.get("fullurl"),
+            "page_id": page["pageid"],
+            "revision_id": page.get("lastrevid"),
+        })
+    return page_info
+
+async def fetch_page_text(page_id: int) -> str:
+    """
+    Fetches the full plain text of one article.
+
+    MediaWiki returns full-article extracts for a single page per request,
+    so callers fetch several articles by running this concurrently.
+    """
+    data = await _query({
+        "pageids": str(page_id),
+        "prop": "extracts",
+        "explaintext": "1",
+        "exsectionformat": "plain",
+    })
+    pages = data.get("pages", [])
+    return pages[0].get("extract", "") if pages else ""
+
+async def fetch_pages(titles: List[str]) -> List[Dict]:
+    """
+    Fetches summary, URL, revision and full text of several articles.
+
+    One batched request resolves all titles; the full texts are then
+    fetched concurrently.
+
+    Returns:
+        List[Dict]: One dict per existing article with "title", "summary",
+        "url", "text" and "revision_id", in the order of `titles`.
+    """
+    page_info = await fetch_page_info(titles)
+    texts = await asyncio.gather(*(fetch_page_text(page["page_id"]) for page in page_info))
+
+    return [
+        {
+            "title": page["title"],
+            "summary": page["summary"],
+            "url": page["url"],
+            "text": text,
+            "revision_id": page["revision_id"],
+        }
+        for page, text in zip(page_info, texts)
+    ]
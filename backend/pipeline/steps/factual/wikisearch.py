@@ -1,10 +1,12 @@
+import asyncio
 import os
 import json
+from typing import Optional
+from sqlalchemy.orm import Session
 from db.models import Hypothesis
-import wikipediaapi as wikidetail
-import wikipedia as wikisearch
+from pipeline.steps.factual.article_cache import get_articles
+from pipeline.steps.factual.wiki_client import fetch_pages, search_titles
 
-WIKI_LANG = "en"  # Use English Wikipedia
 DEBUG_MODE = os.getenv("DEBUG", "False").lower() in ("true", "1")
 
 def _build_query(entities_or_terms, operator="AND"):
@@ -19,72 +21,56 @@ def _build_query(entities_or_terms, operator="AND"):
     return f" {operator} ".join([f'"{item}"' if " "\
          in item else item for item in entities_or_terms])
 
-async def factual_search_step(hypothesis: Hypothesis, max_results: int = 3):
+async def factual_search_step(
+        hypothesis: Hypothesis,
+        max_results: int = 3,
+        db: Optional[Session] = None
+):
     """
     Perform a factual search using Wikipedia.
-    
+
+    All fallback searches are issued concurrently and the first non-empty
+    result in priority order is used; the matching articles are then
+    fetched with one batched request plus concurrent full-text requests.
+    With a database session, unchanged articles are served from the local
+    article cache instead.
+
     Args:
         hypothesis (Hypothesis): The hypothesis object containing the claim.
-        db (Session): The database session.
         max_results (int): The maximum number of results to return.
+        db (Optional[Session]): Database session for the article cache.
 
     Returns:
         List[dict]: A list of dictionaries containing article data.
     """
-    try:
-        wiki = wikidetail.Wikipedia(
-            user_agent="wikipedia-search",
-            extract_format=wikidetail.ExtractFormat.WIKI,
-            language=WIKI_LANG
-        )
-        wikisearch.set_lang(WIKI_LANG)
-
-        # Priority 1: Use extracted entities
-        if hypothesis.extracted_entities:
-            query = _build_query(hypothesis.extracted_entities, operator="AND")
-            search_results = wikisearch.search(query, results=max_results)
-
-            if not search_results:
-                query = _build_query(hypothesis.extracted_entities, operator="OR")
-                search_results = wikisearch.search(query, results=max_results)
-
-        # Priority 2: Use extracted terms if entities fail
-        if not search_results and hypothesis.extracted_terms:
-            query = _build_query(hypothesis.extracted_terms, operator="AND")
-            search_results = wikisearch.search(query, results=max_results)
-
-            if not search_results:
-                query = _build_query(hypothesis.extracted_terms, operator="OR")
-                search_results = wikisearch.search(query, results=max_results)
-
-        if not search_results:
-            return []
-
-        article_data = []
-        for title in search_results:
-            page = wiki.page(title)
-
-            if not page.exists():
-                continue
-
-            # Extract relevant details
-            article_data.append({
-                "title": page.title,
-                "summary": page.summary,
-                "url": page.fullurl,
-                "text": page.text
-            })
-
-            if len(article_data) >= max_results:
-                break
-
-        if DEBUG_MODE:
-            output_file = "../debug/wikipedia_results.json"
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(article_data, f, ensure_ascii=False, indent=4)
-
-        return article_data
-
-    except Exception as e:
-        raise e
+    # Priority 1: Use extracted entities
+    # Priority 2: Use extracted terms if entities fail
+    queries = []
+    for entities_or_terms in (hypothesis.extracted_entities, hypothesis.extracted_terms):
+        if entities_or_terms:
+            queries.append(_build_query(entities_or_terms, operator="AND"))
+            queries.append(_build_query(entities_or_terms, operator="OR"))
+
+    if not queries:
+        return []
+
+    search_results = await asyncio.gather(
+        *(search_titles(query, max_results) for query in queries)
+    )
+    titles = next((titles for titles in search_results if titles), [])
+
+    if not titles:
+        return []
+
+    if db is not None:
+        article_data = (await get_articles(titles, db))[:max_results]
+    else:
+        article_data = (await fetch_pages(titles))[:max_results]
+
+    if DEBUG_MODE:
+        output_file = "../debug/wikipedia_results.json"
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(article_data, f, ensure_ascii=False, indent=4)
+
+    return article_data
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from cachetools import LRUCache
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from crud import embeddings as crud_embeddings
+from core.metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+
+def text_hash(text: str) -> str:
+    """Returns the content hash used to key an embedding of the given text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """
+    Content-addressed embedding cache keyed by model name and text hash.
+
+    Lookups are served from an in-process LRU first and fall back to the
+    `embeddings` table. Vectors are held as contiguous float32 arrays.
+
+    Attributes:
+        memory_hits (int): Lookups answered by the in-process LRU.
+        db_hits (int): Lookups answered by the database.
+        misses (int): Lookups that required an embedding API call.
+    """
+
+    def __init__(self, maxsize: int = EMBEDDING_CACHE_SIZE):
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get_many(
+            self,
+            model: str,
+            texts: List[str],
+            db: Optional[Session] = None
+    ) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """
+        Looks up cached embeddings for the given texts.
+
+        Args:
+            model (str): The embedding model name.
+            texts (List[str]): The texts to look up.
+            db (Optional[Session]): Database session for the persistent tier.
+
+        Returns:
+            Tuple[Dict[int, np.ndarray], List[int]]: The cached vectors keyed by
+            text index, and the indices of texts that are not cached.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[int, np.ndarray] = {}
+        pending: List[int] = []
+
+        for idx, hashed in enumerate(hashes):
+            vector = self._cache.get((model, hashed))
+            if vector is not None:
+                found[idx] = vector
+                self.memory_hits += 1
+            else:
+                pending.append(idx)
+
+        if pending and db is not None:
+            try:
+                stored = crud_embeddings.get_embeddings(
+                    db, model, list({hashes[idx] for idx in pending})
+                )
+            except SQLAlchemyError as e:
+                logger.error("Error reading cached embeddings: %s", e)
+                db.rollback()
+                stored = {}
+
+            for idx in pending:
+                embedding = stored.get(hashes[idx])
+                if embedding is not None:
+                    vector = np.frombuffer(embedding.vector, dtype=np.float32)
+                    self._cache[(model, hashes[idx])] = vector
+                    found[idx] = vector
+                    self.db_hits += 1
+
+        missing = [idx for idx in pending if idx not in found]
+        self.misses += len(missing)
+        return found, missing
+
+    def put_many(
+            self,
+            model: str,
+            texts: List[str],
+            vectors: List[np.ndarray],
+            db: Optional[Session] = None
+    ) -> None:
+        """
+        Stores embeddings for the given texts in the LRU and, if a session
+        is provided, in the database.
+        """
+        serialized: Dict[str, bytes] = {}
+        for text, vector in zip(texts, vectors):
+            vector = np.ascontiguousarray(vector, dtype=np.float32)
+            hashed = text_hash(text)
+            self._cache[(model, hashed)] = vector
+            serialized[hashed] = vector.tobytes()
+
+        if db is None or not serialized:
+            return
+
+        try:
+            crud_embeddings.create_embeddings(
+                db, model, serialized, dimensions=len(vectors[0])
+            )
+        except SQLAlchemyError as e:
+            logger.error("Error persisting embeddings: %s", e)
+            db.rollback()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counters of the store."""
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+        }
+
+embedding_store = EmbeddingStore()
+register_cache("embeddings", lambda: [
+    ("memory", embedding_store.memory_hits, embedding_store.db_hits + embedding_store.misses),
+    ("database", embedding_store.db_hits, embedding_store.misses),
+])
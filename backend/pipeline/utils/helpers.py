@@ -1,10 +1,12 @@
-import json
 import logging
 import time
 import traceback
+from typing import Any, Dict
 from sqlalchemy.orm import Session
+from core import utils
+from messaging.hub import publish_progress
 from messaging.redis import AsyncRedisClient
-from db.models import Hypothesis
+from db.models import Hypothesis, ValidationResult
 
 logger = logging.getLogger(__name__)
 redis_client = AsyncRedisClient()
@@ -17,7 +19,7 @@ async def publish_update(
     error: str = None
 ):
     """
-    Helper to publish pipeline updates to Redis.
+    Helper to publish pipeline updates to the hypothesis' progress stream.
     """
     message = {
         "id": hypothesis.id,
@@ -30,7 +32,44 @@ async def publish_update(
     if error:
         message["error"] = error
 
-    await redis_client.publish("pipeline_updates", json.dumps(message))
+    await publish_progress(redis_client.redis, hypothesis.id, message)
+
+async def publish_queue_position(hypothesis_id: str, position: int):
+    """
+    Helper to publish the queue position of a waiting pipeline to its
+    hypothesis' progress stream.
+    """
+    message = {
+        "id": hypothesis_id,
+        "step": "Queued",
+        "title": "Waiting in queue",
+        "comment": f"{position} validation(s) ahead in the queue.",
+        "position": position,
+        "time": time.time()
+    }
+
+    await publish_progress(redis_client.redis, hypothesis_id, message)
+
+
+def save_validation_result(
+    db: Session,
+    hypothesis: Hypothesis,
+    evaluation: Dict[str, Any]
+) -> ValidationResult:
+    """
+    Helper to store the outcome of an evaluation step as a ValidationResult.
+    """
+    validation_result = ValidationResult(
+        id=utils.generate_id('V'),
+        hypothesis_id=hypothesis.id,
+        classification=evaluation.get("classification"),
+        motivation=evaluation.get("motivation"),
+        sources=evaluation.get("sources", [])
+    )
+    db.add(validation_result)
+    db.commit()
+    db.refresh(validation_result)
+    return validation_result
 
 
 async def handle_pipeline_error(
@@ -0,0 +1,40 @@
+import numpy as np
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scales each row of a matrix to unit length.
+
+    Rows with zero norm are left as zeros so they score 0.0 against any query.
+
+    Args:
+        matrix (np.ndarray): A 2-D array of embedding vectors.
+
+    Returns:
+        np.ndarray: A C-contiguous float32 array of the normalised rows.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, np.finfo(np.float32).tiny, out=norms)
+    return matrix / norms
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Selects the indices of the k highest scores in descending score order.
+
+    Uses a partial partition so only the selected k scores are fully sorted.
+
+    Args:
+        scores (np.ndarray): A 1-D array of scores.
+        k (int): The number of indices to select.
+
+    Returns:
+        np.ndarray: The indices of the top k scores, best first.
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(scores[candidates])[::-1]]
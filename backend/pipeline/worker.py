@@ -0,0 +1,128 @@
+"""
+Standalone worker process that runs queued validation pipelines.
+
+Usage:
+    python -m pipeline.worker
+
+Start several processes to scale out; each runs WORKER_CONCURRENCY
+pipelines concurrently. Set WORKER_METRICS_PORT to expose the worker's
+Prometheus metrics on that port.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+from dotenv import load_dotenv
+from prometheus_client import start_http_server
+from redis.exceptions import RedisError
+
+# Load environment variables
+load_dotenv()
+
+from core.http import close_http_client # pylint: disable=C0413
+from core.llm import close_llm_client # pylint: disable=C0413
+from core.logging import configure_logging # pylint: disable=C0413
+from core.tracing import configure_tracing, shutdown_tracing, span # pylint: disable=C0413
+from db.database import SessionLocal # pylint: disable=C0413
+from messaging.queue import Job # pylint: disable=C0413
+from pipeline.orchestrator.manager import ( # pylint: disable=C0413
+    PipelineScheduler, pipeline_scheduler, start_validation_pipeline
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_JOB_TIMEOUT = int(os.getenv("WORKER_JOB_TIMEOUT", "900"))  # seconds per pipeline
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))  # 0 disables
+
+async def _keep_lease(scheduler: PipelineScheduler, job: Job):
+    """Extends the job's lease and running slot until cancelled."""
+    while True:
+        await asyncio.sleep(scheduler.queue.visibility_timeout / 3)
+        await scheduler.heartbeat(job)
+
+async def run_job(job: Job):
+    """
+    Runs the validation pipeline of one job with its own database session.
+
+    The run is traced as a "validation" span continuing the trace of the
+    request that submitted the job.
+    """
+    attributes = {
+        "hypothesis.id": job.payload["hypothesis_id"],
+        "job.id": job.id,
+        "job.attempts": job.attempts,
+    }
+    with span("validation", attributes, traceparent=job.payload.get("traceparent")), \
+            SessionLocal() as db:
+        await asyncio.wait_for(
+            start_validation_pipeline(job.payload["hypothesis_id"], db),
+            timeout=WORKER_JOB_TIMEOUT
+        )
+
+async def worker_loop(scheduler: PipelineScheduler, worker_index: int, stop: asyncio.Event):
+    """
+    Claims and runs jobs one at a time until `stop` is set.
+
+    Jobs are acknowledged once their pipeline returned, also when it
+    failed: pipelines record their own failures, and only jobs of crashed
+    workers are redelivered.
+    """
+    while not stop.is_set():
+        job = await scheduler.claim(timeout=1.0)
+        if job is None:
+            continue
+
+        logger.info("Worker %d started job %s (attempt %d)", worker_index, job.id, job.attempts + 1)
+        lease = asyncio.create_task(_keep_lease(scheduler, job))
+        try:
+            await run_job(job)
+        except Exception as e: # pylint: disable=broad-except
+            logger.error("Job %s failed: %s", job.id, e, exc_info=True)
+        finally:
+            lease.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await lease
+        await scheduler.release(job)
+
+async def reaper_loop(scheduler: PipelineScheduler, stop: asyncio.Event):
+    """Periodically requeues jobs of crashed workers and refreshes the queue metrics."""
+    while not stop.is_set():
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=scheduler.queue.visibility_timeout / 2)
+        await scheduler.queue.requeue_expired()
+        try:
+            await scheduler.update_metrics()
+        except RedisError as e:
+            logger.warning("Failed to read queue metrics: %s", e)
+
+async def main(
+        concurrency: int = WORKER_CONCURRENCY,
+        scheduler: PipelineScheduler = pipeline_scheduler
+):
+    """Runs the workers until the process receives SIGINT or SIGTERM."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
+        logger.info("Serving metrics on port %d", WORKER_METRICS_PORT)
+
+    logger.info("Starting %d pipeline workers on queue %s", concurrency, scheduler.queue.name)
+    try:
+        await asyncio.gather(
+            reaper_loop(scheduler, stop),
+            *(worker_loop(scheduler, idx, stop) for idx in range(concurrency))
+        )
+    finally:
+        await close_http_client()
+        await close_llm_client()
+        shutdown_tracing()
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_tracing()
+    asyncio.run(main())
@@ -1,5 +1,8 @@
+from contextlib import contextmanager
 from typing import List, Optional
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import RedisError
 from sqlalchemy.orm import Session
 from crud import hypothesises as crud_hypothesises
 from schemas import hypothesises as hypothesis_schemas
@@ -8,10 +11,39 @@ from db.database import get_db
 from db import models
 from core.auth import get_current_user
 from core.utils import is_admin_or_entity_owner
-from pipeline.orchestrator.manager import start_validation_pipeline
+from pipeline.orchestrator.manager import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, QueueFullError, pipeline_scheduler
+)
 
 router = APIRouter()
 
+QUEUE_FULL_RETRY_AFTER = 30  # seconds
+
+@contextmanager
+def _queue_errors():
+    """Reports a full validation queue as 429 and an unavailable one as 503."""
+    try:
+        yield
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many validations are queued, please try again later",
+            headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER)}
+        ) from e
+    except RedisError as e:
+        raise HTTPException(
+            status_code=503, detail="Validation queue is unavailable"
+        ) from e
+
+async def _enqueue_validation(
+        hypothesis_id: str,
+        user_id: str,
+        priority: str = PRIORITY_INTERACTIVE
+) -> str:
+    """Queues the validation pipeline of a hypothesis."""
+    with _queue_errors():
+        return await pipeline_scheduler.submit(hypothesis_id, user_id, priority)
+
 @router.post("/", response_model=hypothesis_schemas.HypothesisResponse)
 def create_hypothesis(
     hypothesis: hypothesis_schemas.HypothesisCreate,
@@ -77,12 +109,11 @@ def get_hypothesis(
     return hypothesis_schemas.HypothesisResponse(**hypothesis.__dict__)
 
 @router.put("/{hypothesis_id}", response_model=hypothesis_schemas.HypothesisResponse)
-def update_hypothesis(
+async def update_hypothesis(
     hypothesis_id: str,
     hypothesis_update: hypothesis_schemas.HypothesisUpdate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    _current_user: models.User = Depends(
+    current_user: models.User = Depends(
         is_admin_or_entity_owner(
             crud_hypothesises.get_hypothesis_by_id,
             entity_name="Hypothesis",
@@ -90,14 +121,25 @@ def update_hypothesis(
         )
     )
 ):
-    """Update an existing hypothesis's details."""
-    updated_hypothesis, is_content_updated = crud_hypothesises.update_hypothesis(
-        db, hypothesis_id, hypothesis_update
+    """
+    Update an existing hypothesis's details.
+
+    A content change queues a new validation. Admission to the validation
+    queue is checked before anything is saved, so a 429 or 503 response
+    leaves the hypothesis unchanged and the request can be retried as is.
+    """
+    hypothesis = await run_in_threadpool(crud_hypothesises.get_hypothesis_by_id, db, hypothesis_id)
+    if hypothesis and hypothesis_update.content \
+            and hypothesis_update.content != hypothesis.content:
+        with _queue_errors():
+            await pipeline_scheduler.check_admission()
+
+    updated_hypothesis, is_content_updated = await run_in_threadpool(
+        crud_hypothesises.update_hypothesis, db, hypothesis_id, hypothesis_update
     )
 
     if is_content_updated:
-        hypothesis_id = str(updated_hypothesis.id)
-        background_tasks.add_task(start_validation_pipeline, hypothesis_id, db)
+        await _enqueue_validation(str(updated_hypothesis.id), current_user.id)
 
     return updated_hypothesis
 
@@ -117,26 +159,33 @@ def delete_hypothesis(
     crud_hypothesises.delete_hypothesis(db, hypothesis_id)
 
 @router.post("/{hypothesis_id}/validations", status_code=status.HTTP_202_ACCEPTED)
-def run_validation_pipeline(
+async def run_validation_pipeline(
     hypothesis_id: str,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    _current_user: models.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user),
+    priority: str = Query(
+        PRIORITY_INTERACTIVE,
+        pattern=f"^({PRIORITY_INTERACTIVE}|{PRIORITY_BULK})$",
+        description="Scheduling priority ('interactive' or 'bulk' re-validation)"
+    )
 ):
     """
     Trigger the validation pipeline for a specific hypothesis.
+
+    Returns 429 when the validation queue is full.
     """
     # Check if the hypothesis exists
-    hypothesis = crud_hypothesises.get_hypothesis_by_id(db, hypothesis_id)
+    hypothesis = await run_in_threadpool(crud_hypothesises.get_hypothesis_by_id, db, hypothesis_id)
     if not hypothesis:
         raise HTTPException(status_code=404, detail="Hypothesis not found")
 
-    # Trigger the validation pipeline in the background
-    background_tasks.add_task(start_validation_pipeline, hypothesis_id, db)
+    # Queue the validation pipeline for the pipeline workers
+    job_id = await _enqueue_validation(hypothesis_id, current_user.id, priority)
 
     return {
         "message": "Validation pipeline started for hypothesis.", 
-        "hypothesis_id": hypothesis_id
+        "hypothesis_id": hypothesis_id,
+        "job_id": job_id
     }
 
 @router.get("/{hypothesis_id}/validations", \
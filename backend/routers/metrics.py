@@ -0,0 +1,21 @@
+import logging
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from redis.exceptions import RedisError
+from pipeline.orchestrator.manager import pipeline_scheduler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("")
+async def metrics():
+    """
+    Exposes pipeline, LLM, external API and cache metrics in the Prometheus
+    text format.
+    """
+    try:
+        await pipeline_scheduler.update_metrics()
+    except RedisError as e:
+        logger.warning("Failed to read queue metrics: %s", e)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,41 +1,49 @@
 import asyncio
-import json
-from fastapi import APIRouter, Request
+import os
+from typing import Optional
+from fastapi import APIRouter, Header
 from fastapi.responses import StreamingResponse
+from messaging.hub import ProgressHub
 from messaging.redis import AsyncRedisClient
 
 router = APIRouter()
 redis_client = AsyncRedisClient()
 
+SSE_KEEPALIVE_INTERVAL = float(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))  # seconds
+
+# One Redis subscription per process, shared by all connected clients
+progress_hub = ProgressHub(redis_client.redis)
+
 @router.get("/progress/{hypothesis_id}")
 async def sse_progress(
     hypothesis_id: str,
-    request: Request,
+    last_event_id: Optional[str] = Header(None),
 ):
     """
     Streams the current pipeline status as Server-Sent Events (SSE).
-    """
-    pubsub = redis_client.redis.pubsub()
-    await pubsub.subscribe("pipeline_updates")
 
+    Each event carries its ID, so a reconnecting client that sends the
+    Last-Event-ID header first receives the events it missed. Without
+    events, a comment is sent every SSE_KEEPALIVE_INTERVAL seconds to keep
+    proxies from closing the connection. When the client disconnects the
+    stream is cancelled, which ends its subscription.
+    """
     async def event_generator():
-        try:
+        async with progress_hub.subscribe(hypothesis_id, last_event_id) as updates:
             while True:
-                if await request.is_disconnected():
-                    break
-
-                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                if message and message["type"] == "message":
-                    data = json.loads(message["data"])
-                    if data["id"] == hypothesis_id:
-                        yield f"data: {json.dumps(data)}\n\n"
+                try:
+                    event = await asyncio.wait_for(updates.get(), timeout=SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event.id}\ndata: {event.raw}\n\n"
 
-                        # Disconnect the client if the pipeline is completed
-                        if data["step"] in ["Completed"]:
-                            break
-
-                await asyncio.sleep(0.1)
-        finally:
-            await redis_client.unsubscribe(pubsub, "pipeline_updates")
+                # Disconnect the client if the pipeline is completed
+                if event.data["step"] in ["Completed"]:
+                    break
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
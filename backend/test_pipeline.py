@@ -0,0 +1,912 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+import fakeredis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import httpx
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from core import http, llm, metrics, tracing
+from core.cache import DatabaseCache, MemoryCache, TieredCache
+from core.rate_limit import TokenBucket, backoff_delay, parse_retry_after
+from crud import pipeline_runs as crud_pipeline_runs
+from crud.academic_works import bulk_upsert_academic_works
+from db.database import Base
+from db.models import AcademicWork, Hypothesis, ValidationResult
+from messaging.hub import ProgressHub, progress_key, publish_progress
+from messaging.queue import JobQueue
+from messaging.single_flight import SingleFlight
+from pipeline.orchestrator import engine as pipeline_engine, manager
+from pipeline.utils import helpers
+from pipeline.steps.academic import summarization, vector_index
+from pipeline.steps.academic.academic_search import _search_cache_key
+from pipeline.steps.academic.ranking import _batch_inputs
+from pipeline.steps.factual import article_cache
+from pipeline.steps.factual.passages import chunk_text, select_passages
+from pipeline.steps.factual.wikisearch import factual_search_step
+from pipeline.utils.embedding_store import EmbeddingStore
+from pipeline.utils.vectors import normalize_rows, top_k
+from routers import sse
+from prometheus_client import REGISTRY, generate_latest
+from schemas.academic_works import AcademicWorkCreate
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base.metadata.create_all(bind=engine)
+
+@pytest.fixture
+def ignore_updates(monkeypatch):
+    """Discards the progress updates published by pipelines."""
+    async def ignore_update(*_args, **_kwargs):
+        pass
+
+    monkeypatch.setattr(pipeline_engine, "publish_update", ignore_update)
+    monkeypatch.setattr(helpers, "publish_update", ignore_update)
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Answers every chat completion with 1000 prompt and 100 completion tokens."""
+    async def create(**_kwargs):
+        message = SimpleNamespace(content="answer")
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm, "_client", fake_client)
+
+def test_batch_inputs_respects_size_and_token_budget():
+    """Tests that embedding inputs are split by count and estimated tokens, in order."""
+    texts = ["a" * 30, "b" * 30, "c" * 30, "d" * 300, "e"]
+
+    batches = _batch_inputs(texts, max_size=2, token_budget=25)
+
+    assert batches == [["a" * 30, "b" * 30], ["c" * 30], ["d" * 300], ["e"]]
+    assert [text for batch in batches for text in batch] == texts
+
+def test_embedding_store_serves_from_memory_then_database():
+    """Tests that stored embeddings are found in the LRU and, in a fresh process, in the DB."""
+    db = TestingSessionLocal()
+    vector = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+
+    store = EmbeddingStore(maxsize=10)
+    store.put_many("model-a", ["some text"], [vector], db)
+
+    found, missing = store.get_many("model-a", ["some text", "other text"], db)
+    assert missing == [1]
+    assert np.array_equal(found[0], vector)
+    assert store.stats()["memory_hits"] == 1
+
+    fresh_store = EmbeddingStore(maxsize=10)
+    found, missing = fresh_store.get_many("model-a", ["some text"], db)
+    assert not missing
+    assert np.array_equal(found[0], vector)
+    assert fresh_store.stats()["db_hits"] == 1
+
+    _, missing = fresh_store.get_many("model-b", ["some text"], db)
+    assert missing == [0]
+    db.close()
+
+def test_top_k_returns_best_scores_first():
+    """Tests that top-k selection over normalised rows matches a full sort."""
+    matrix = normalize_rows(np.array([[1, 0], [0, 2], [1, 1], [0, 0]], dtype=np.float32))
+    query = normalize_rows(np.array([[1, 0.1]], dtype=np.float32))[0]
+    scores = matrix @ query
+
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+    assert scores[3] == 0.0
+    assert list(top_k(scores, 2)) == [0, 2]
+    assert list(top_k(scores, 10)) == list(np.argsort(scores)[::-1])
+
+def test_vector_index_ivf_search_and_persistence(tmp_path, monkeypatch):
+    """Tests that an IVF index finds a stored vector and survives a save/load round trip."""
+    monkeypatch.setattr(vector_index, "IVF_MIN_SIZE", 100)
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    ids = [f"W{idx}" for idx in range(len(vectors))]
+
+    index = vector_index.VectorIndex.build(ids, vectors)
+    assert index.centroids is not None
+
+    hits = index.search(vectors[42], k=3, nprobe=4)
+    assert hits[0][0] == "W42"
+    assert abs(hits[0][1] - 1.0) < 1e-5
+
+    index.save(str(tmp_path / "index"))
+    loaded = vector_index.VectorIndex.load(str(tmp_path / "index"))
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.search(vectors[42], k=3, nprobe=4) == hits
+
+    # Saving again swaps the directory and leaves no temporary directories behind
+    index.save(str(tmp_path / "index"))
+    assert os.listdir(tmp_path) == ["index"]
+
+def test_summarize_abstracts_bounds_concurrency_and_persists(monkeypatch):
+    """Tests that summaries run concurrently up to the limit and are stored for every paper."""
+    db = TestingSessionLocal()
+    works = [
+        AcademicWork(id=f"WS{idx}", core_id=f"S{idx}", title=f"Paper {idx}",
+                     apa_citation=f"Paper {idx}.", abstract="An abstract.")
+        for idx in range(5)
+    ]
+    db.add_all(works)
+    db.commit()
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_summarization(text):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"summary": f"Summary of {text}", "phrase": "Phrase", "topics": "Topic"}
+
+    monkeypatch.setattr(summarization, "SUMMARIZATION_CONCURRENCY", 2)
+    monkeypatch.setattr(summarization, "_perform_llm_summarization", fake_summarization)
+
+    results = [{"id": work.id, "title": work.title, "abstract": work.abstract} for work in works]
+    results = asyncio.run(summarization.summarize_abstracts(results, db))
+
+    assert max_in_flight == 2
+    assert all(result["summary"].startswith("Summary of Paper") for result in results)
+    db.expire_all()
+    assert db.query(AcademicWork).filter(
+        AcademicWork.id.like("WS%"), AcademicWork.llm_summary.isnot(None)
+    ).count() == 5
+
+    async def unexpected_summarization(text):
+        raise AssertionError(f"Stored summary not reused for {text}")
+
+    monkeypatch.setattr(summarization, "_perform_llm_summarization", unexpected_summarization)
+    results = asyncio.run(summarization.summarize_abstracts(results, db))
+    assert all(result["phrase"] == "Phrase" for result in results)
+    db.close()
+
+def test_summarize_abstracts_skips_invalid_completions(monkeypatch):
+    """Tests that an invalid LLM response leaves the paper unsummarized instead of failing."""
+    db = TestingSessionLocal()
+    db.add(AcademicWork(id="WINVALID", core_id="SINVALID", title="Paper",
+                        apa_citation="Paper.", abstract="An abstract."))
+    db.commit()
+
+    async def invalid_completion(*_args, **_kwargs):
+        return "This is not JSON."
+
+    monkeypatch.setattr(summarization, "chat_completion", invalid_completion)
+
+    results = [{"id": "WINVALID", "title": "Paper", "abstract": "An abstract."}]
+    results = asyncio.run(summarization.summarize_abstracts(results, db))
+
+    assert results == [{"id": "WINVALID", "title": "Paper", "abstract": "An abstract."}]
+    db.expire_all()
+    assert db.get(AcademicWork, "WINVALID").llm_summary is None
+    db.close()
+
+def test_bulk_upsert_academic_works_returns_new_and_existing_rows():
+    """Tests that one bulk upsert inserts new works and returns existing ones unchanged."""
+    db = TestingSessionLocal()
+
+    def work(core_id, title):
+        return AcademicWorkCreate(core_id=core_id, title=title, authors=[], links=[],
+                                  published_date="2020-01-01")
+
+    first = bulk_upsert_academic_works(db, [work("U1", "First"), work("U2", "Second")])
+    assert [w.core_id for w in first] == ["U1", "U2"]
+    assert first[0].apa_citation == "No listed authors (2020). First."
+
+    second = bulk_upsert_academic_works(
+        db, [work("U3", "Third"), work("U1", "First (renamed)"), work("U3", "Third again")]
+    )
+    assert [w.core_id for w in second] == ["U3", "U1"]
+    assert second[1].id == first[0].id
+    assert second[1].title == "First"
+    assert db.query(AcademicWork).filter(AcademicWork.core_id.like("U%")).count() == 3
+    db.close()
+
+def test_token_bucket_spreads_requests_after_burst():
+    """Tests that the limiter allows a burst and then paces callers at its rate."""
+    bucket = TokenBucket("test", rate=50, capacity=2)
+
+    async def acquire_all():
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(4)))
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire_all()) >= 0.035
+
+def test_retry_after_parsing_and_backoff_bounds():
+    """Tests Retry-After parsing in seconds and dates, and the backoff ceiling."""
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after("2000-01-01T00:00:00Z") == 0.0
+    assert all(0 <= backoff_delay(attempt, base=1, cap=4) <= 4 for attempt in range(10))
+
+def test_tiered_cache_backfills_and_expires():
+    """Tests that a slower-tier hit is copied to the faster tier and entries expire."""
+    fast, slow = MemoryCache(), MemoryCache()
+    cache = TieredCache(fast, slow, ttl=60)
+
+    async def scenario():
+        await slow.set("key", ["C1", "C2"], ttl=60)
+        assert await cache.get("key") == ["C1", "C2"]
+        assert await fast.get("key") == ["C1", "C2"]
+
+        await cache.set("short", [], ttl=-1)
+        assert await cache.get("short") is None
+
+    asyncio.run(scenario())
+
+def test_search_cache_key_normalises_query():
+    """Tests that equivalent CORE queries share a cache key and options do not."""
+    key = _search_cache_key("(Social Media AND  mental health)", 10, False)
+
+    assert key == _search_cache_key(" (social media AND mental Health) ", 10, False)
+    assert key != _search_cache_key("(social media and mental health)", 10, False)
+    assert key != _search_cache_key("(social media AND mental health)", 5, False)
+    assert key != _search_cache_key("(social media AND mental health)", 10, True)
+
+def test_chat_completion_caches_deterministic_prompts(monkeypatch):
+    """Tests that temperature-0 completions are cached unless the caller opts out."""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=f"answer {len(calls)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm, "_client", fake_client)
+    monkeypatch.setattr(llm, "completion_cache", TieredCache(MemoryCache(), ttl=60))
+    messages = [{"role": "user", "content": "Is water wet?"}]
+
+    async def scenario():
+        first = await llm.chat_completion(messages, temperature=0.0)
+        assert await llm.chat_completion(messages, temperature=0.0) == first
+        assert await llm.chat_completion(messages, temperature=0.0, cache=False) != first
+        assert await llm.chat_completion(messages) != first
+        assert await llm.chat_completion(messages, model="other", temperature=0.0) != first
+
+    asyncio.run(scenario())
+    assert len(calls) == 4
+
+def test_database_cache_round_trip_and_expiry():
+    """Tests that the database cache stores, overwrites and expires JSON values."""
+    cache = DatabaseCache(prefix="test", session_factory=TestingSessionLocal)
+
+    async def scenario():
+        await cache.set("key", {"content": "first"}, ttl=60)
+        await cache.set("key", {"content": "second"}, ttl=60)
+        assert await cache.get("key") == {"content": "second"}
+
+        await cache.set("expired", "value", ttl=-1)
+        assert await cache.get("expired") is None
+        assert await cache.get("missing") is None
+
+    asyncio.run(scenario())
+    assert cache.hits == 1 and cache.misses == 2
+
+def test_factual_search_step_uses_batched_wikipedia_requests(monkeypatch):
+    """Tests search fallback priority, redirect resolution and batched page fetching."""
+    requests = []
+
+    def handler(request):
+        params = dict(request.url.params)
+        requests.append(params)
+        if params.get("list") == "search":
+            titles = ["Berlin wall"] if params["srsearch"] == "Berlin OR 1989" else []
+            return httpx.Response(200, json={"query": {"search": [
+                {"title": title} for title in titles
+            ]}})
+        if "titles" in params:
+            return httpx.Response(200, json={"query": {
+                "redirects": [{"from": "Berlin wall", "to": "Berlin Wall"}],
+                "pages": [{"pageid": 7, "title": "Berlin Wall", "extract": "Intro.",
+                           "fullurl": "https://en.wikipedia.org/wiki/Berlin_Wall",
+                           "lastrevid": 42}],
+            }})
+        return httpx.Response(200, json={"query": {"pages": [
+            {"pageid": 7, "extract": "Intro. Full text."}
+        ]}})
+
+    monkeypatch.setattr(http, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    hypothesis = SimpleNamespace(extracted_entities=["Berlin", "1989"], extracted_terms=["wall"])
+
+    articles = asyncio.run(factual_search_step(hypothesis))
+
+    assert articles == [{
+        "title": "Berlin Wall",
+        "summary": "Intro.",
+        "url": "https://en.wikipedia.org/wiki/Berlin_Wall",
+        "text": "Intro. Full text.",
+        "revision_id": 42,
+    }]
+    assert len([params for params in requests if params.get("list") == "search"]) == 4
+    assert len(requests) == 6
+
+def test_article_cache_revalidates_by_revision(monkeypatch):
+    """Tests that unchanged articles are served locally and new revisions are re-downloaded."""
+    revision = {"id": 1}
+    text_requests = []
+
+    def handler(request):
+        params = dict(request.url.params)
+        if "pageids" in params:
+            text_requests.append(params["pageids"])
+            return httpx.Response(200, json={"query": {"pages": [
+                {"pageid": 9, "extract": f"Revision {revision['id']}."}
+            ]}})
+        return httpx.Response(200, json={"query": {"pages": [
+            {"pageid": 9, "title": "Oslo", "extract": "Capital.",
+             "fullurl": "https://en.wikipedia.org/wiki/Oslo", "lastrevid": revision["id"]}
+        ]}})
+
+    monkeypatch.setattr(http, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    db = TestingSessionLocal()
+
+    first = asyncio.run(article_cache.get_articles(["Oslo"], db))
+    assert first[0]["text"] == "Revision 1." and text_requests == ["9"]
+
+    # Within the revalidation window no request is sent at all
+    monkeypatch.setattr(http, "_client", httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(500)
+    )))
+    assert asyncio.run(article_cache.get_articles(["Oslo"], db)) == first
+
+    # Afterwards an unchanged revision is served from the cache...
+    monkeypatch.setattr(http, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(article_cache, "WIKI_CACHE_REVALIDATE_AFTER", -1)
+    assert asyncio.run(article_cache.get_articles(["Oslo"], db)) == first
+    assert text_requests == ["9"]
+
+    # ...and a new revision is downloaded again
+    revision["id"] = 2
+    second = asyncio.run(article_cache.get_articles(["Oslo"], db))
+    assert second[0]["text"] == "Revision 2." and second[0]["revision_id"] == 2
+    assert text_requests == ["9", "9"]
+    db.close()
+
+def test_select_passages_keeps_relevant_text_within_budget():
+    """Tests that article text is chunked and only the best matching passages are kept."""
+    filler = "\n".join(
+        f"Paragraph {idx} describes the local cuisine and music." for idx in range(40)
+    )
+    articles = [
+        {"title": "Paris", "text": f"{filler}\nThe Eiffel Tower was completed in 1889."},
+        {"title": "Lyon", "text": filler},
+    ]
+
+    assert all(len(passage) <= 200 for passage in chunk_text(articles[0]["text"], max_chars=200))
+
+    passages = select_passages("Eiffel Tower completed 1889", articles, token_budget=400)
+
+    assert sum(len(passage["text"]) // 3 + 1 for passage in passages) <= 400
+    assert any("Eiffel Tower was completed" in passage["text"] for passage in passages)
+    assert passages[0]["source"] == 1 and passages[0]["title"] == "Paris"
+
+def test_job_queue_acknowledges_and_redelivers_lost_jobs():
+    """Tests FIFO delivery, acknowledgement, and redelivery after a lease expires."""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    queue = JobQueue(redis, "test", max_attempts=2)
+
+    async def scenario():
+        first_id = await queue.enqueue({"hypothesis_id": "H1"})
+        await queue.enqueue({"hypothesis_id": "H2"})
+
+        first = await queue.dequeue(timeout=0.1)
+        assert first.id == first_id and first.payload == {"hypothesis_id": "H1"}
+        await queue.ack(first)
+
+        # The worker holding the second job crashes and its lease expires
+        lost = await queue.dequeue(timeout=0.1)
+        assert await queue.dequeue(timeout=0.1) is None
+        await redis.delete(queue.lease_key(lost.id))
+
+        # The first pass only marks the job as suspect, the second requeues it
+        assert await queue.requeue_expired() == 0
+        assert await queue.requeue_expired() == 1
+        redelivered = await queue.dequeue(timeout=0.1)
+        assert redelivered.id == lost.id and redelivered.attempts == 1
+
+        await redis.delete(queue.lease_key(redelivered.id))
+        await queue.requeue_expired()
+        await queue.requeue_expired()
+        assert await queue.size() == 0
+        assert await redis.llen(queue.dead_key) == 1
+
+    asyncio.run(scenario())
+
+def test_scheduler_enforces_priorities_caps_and_backpressure(monkeypatch):
+    """Tests interactive-first claiming, the per-user cap, positions and a full queue."""
+    positions = []
+
+    async def record_position(hypothesis_id, position):
+        positions.append((hypothesis_id, position))
+
+    monkeypatch.setattr(manager, "publish_queue_position", record_position)
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    scheduler = manager.PipelineScheduler(
+        redis,
+        JobQueue(redis, "test_scheduler", priorities=("interactive", "bulk")),
+        max_running=10,
+        max_running_per_user=1,
+        max_queued=3
+    )
+
+    async def scenario():
+        await scheduler.submit("H1", "U1", "bulk")
+        await scheduler.submit("H2", "U1", "interactive")
+        await scheduler.submit("H3", "U2", "interactive")
+        assert positions == [("H1", 0), ("H2", 0), ("H3", 1)]
+
+        try:
+            await scheduler.submit("H4", "U3", "interactive")
+            assert False, "expected QueueFullError"
+        except manager.QueueFullError:
+            pass
+        try:
+            await scheduler.check_admission()
+            assert False, "expected QueueFullError"
+        except manager.QueueFullError:
+            pass
+
+        first = await scheduler.claim(timeout=0)
+        assert first.payload["hypothesis_id"] == "H2"
+
+        # H3 is next; the bulk job of U1 must wait while U1 is at its cap
+        second = await scheduler.claim(timeout=0)
+        assert second.payload["hypothesis_id"] == "H3"
+        assert await scheduler.claim(timeout=0) is None
+        assert await scheduler.queue.size() == 1
+
+        await scheduler.release(first)
+        third = await scheduler.claim(timeout=0)
+        assert third.payload["hypothesis_id"] == "H1"
+
+    asyncio.run(scenario())
+
+def test_scheduler_keeps_queue_order_while_all_slots_are_taken(monkeypatch):
+    """Tests that jobs waiting for a global slot are claimed in submission order."""
+    async def ignore_position(_hypothesis_id, _position):
+        pass
+
+    monkeypatch.setattr(manager, "publish_queue_position", ignore_position)
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    scheduler = manager.PipelineScheduler(
+        redis,
+        JobQueue(redis, "test_order", priorities=("interactive", "bulk")),
+        max_running=1,
+        max_running_per_user=5
+    )
+
+    async def scenario():
+        await scheduler.submit("H0", "U0")
+        running = await scheduler.claim(timeout=0)
+        for index in range(1, 4):
+            await scheduler.submit(f"H{index}", f"U{index}")
+
+        # Idle workers poll while the only slot is taken
+        for _ in range(5):
+            assert await scheduler.claim(timeout=0) is None
+        waiting = await scheduler.queue.peek("interactive", 3)
+        assert [job["payload"]["hypothesis_id"] for job in waiting] == ["H1", "H2", "H3"]
+
+        claimed = []
+        for _ in range(3):
+            await scheduler.release(running)
+            running = await scheduler.claim(timeout=0)
+            claimed.append(running.payload["hypothesis_id"])
+        assert claimed == ["H1", "H2", "H3"]
+
+    asyncio.run(scenario())
+
+def test_single_flight_refresh_fails_after_losing_leadership():
+    """Tests that an expired leader cannot refresh the leadership taken over by another owner."""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    flight = SingleFlight(redis, "test_refresh", ttl=60)
+
+    async def scenario():
+        assert await flight.try_lead("K", "OLD") is None
+        assert await flight.refresh("K", "OLD")
+
+        # The old leader's key expires and another owner takes over
+        await redis.delete("singleflight:test_refresh:K")
+        assert await flight.try_lead("K", "NEW") is None
+        assert not await flight.refresh("K", "OLD")
+        assert await flight.leader("K") == "NEW"
+        assert await flight.refresh("K", "NEW")
+
+    asyncio.run(scenario())
+
+def test_identical_claims_share_one_validation(monkeypatch):
+    """Tests that a duplicate claim follows the in-flight run and a later one reuses its result."""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    flight = SingleFlight(redis, "test_validation")
+    updates, mirrored = [], []
+
+    async def record_update(hypothesis, step, title, comment=None, error=None): # pylint: disable=W0613
+        updates.append((hypothesis.id, step, hypothesis.status))
+
+    async def record_mirrored(_redis, hypothesis_id, message):
+        mirrored.append((hypothesis_id, message))
+
+    monkeypatch.setattr(manager, "validation_flight", flight)
+    monkeypatch.setattr(manager, "redis_client", SimpleNamespace(redis=redis))
+    monkeypatch.setattr(manager, "publish_progress", record_mirrored)
+    monkeypatch.setattr(manager, "publish_update", record_update)
+
+    db = TestingSessionLocal()
+    content_hash = manager.hypothesis_content_hash("Water boils at 100 degrees.")
+    assert manager.hypothesis_content_hash("  water BOILS at 100   degrees ") == content_hash
+    for hypothesis_id in ("HLEADER", "HFOLLOWER", "HLATER"):
+        db.add(Hypothesis(id=hypothesis_id, user_id="U1", content="Water boils at 100 degrees.",
+                          content_hash=content_hash, status="Pending"))
+    db.commit()
+
+    async def scenario():
+        assert await flight.try_lead(content_hash, "HLEADER") is None
+        follower = asyncio.create_task(
+            manager.start_validation_pipeline("HFOLLOWER", TestingSessionLocal())
+        )
+        await asyncio.sleep(0.1)
+        await redis.publish(progress_key("HLEADER"), "malformed")
+        await publish_progress(redis, "HLEADER", {"id": "HLEADER", "step": "SearchingFact"})
+        await publish_progress(redis, "HLEADER", {"id": "HLEADER", "step": "Finished"})
+        await asyncio.sleep(0.1)
+
+        # The leader finishes its run
+        leader = db.get(Hypothesis, "HLEADER")
+        leader.status = "Completed"
+        leader.query_type = "factual"
+        db.add(ValidationResult(id="VLEADER", hypothesis_id="HLEADER",
+                                classification="A", motivation="Well known.", sources=[]))
+        db.commit()
+        await flight.release(content_hash, "HLEADER")
+        await asyncio.wait_for(follower, timeout=5)
+
+        await manager.start_validation_pipeline("HLATER", TestingSessionLocal())
+
+    asyncio.run(scenario())
+
+    db.expire_all()
+    for hypothesis_id in ("HFOLLOWER", "HLATER"):
+        hypothesis = db.get(Hypothesis, hypothesis_id)
+        assert hypothesis.status == "Completed" and hypothesis.query_type == "factual"
+        assert [result.classification for result in hypothesis.validation_results] == ["A"]
+    assert mirrored == [("HFOLLOWER", {"id": "HFOLLOWER", "step": "SearchingFact"})]
+    # The follower announces its end only once it holds the copied result
+    assert ("HFOLLOWER", "Finished", "Completed") in updates
+    assert ("HLATER", "ReusedResult", "Completed") in updates
+    db.close()
+
+def test_duplicate_job_waits_for_the_running_validation(monkeypatch):
+    """Tests that a second job for a hypothesis being validated does not run it again."""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    flight = SingleFlight(redis, "test_duplicate")
+
+    async def unexpected_run(hypothesis, _db):
+        raise AssertionError(f"{hypothesis.id} validated twice")
+
+    monkeypatch.setattr(manager, "validation_flight", flight)
+    monkeypatch.setattr(manager, "redis_client", SimpleNamespace(redis=redis))
+    monkeypatch.setattr(manager, "_run_validation_pipeline", unexpected_run)
+
+    db = TestingSessionLocal()
+    content_hash = manager.hypothesis_content_hash("The moon is made of cheese.")
+    db.add(Hypothesis(id="HTWICE", user_id="U1", content="The moon is made of cheese.",
+                      content_hash=content_hash, status="Processing"))
+    db.commit()
+
+    async def scenario():
+        # The first job leads the validation of the hypothesis
+        assert await flight.try_lead(content_hash, "HTWICE") is None
+        duplicate = asyncio.create_task(
+            manager.start_validation_pipeline("HTWICE", TestingSessionLocal())
+        )
+        await asyncio.sleep(0.1)
+        assert not duplicate.done()
+
+        db.get(Hypothesis, "HTWICE").status = "Completed"
+        db.commit()
+        await flight.release(content_hash, "HTWICE")
+        await asyncio.wait_for(duplicate, timeout=5)
+
+    asyncio.run(scenario())
+    db.close()
+
+def test_pipeline_engine_runs_independent_steps_concurrently(monkeypatch):
+    """Tests DAG scheduling, halting with a final status and per-step timeouts."""
+    updates, events = [], []
+
+    async def record_update(hypothesis, step, title, comment=None, error=None): # pylint: disable=W0613
+        updates.append((step, "error" if error else "done" if comment else "start"))
+
+    monkeypatch.setattr(pipeline_engine, "publish_update", record_update)
+    monkeypatch.setattr(helpers, "publish_update", record_update)
+    db = SimpleNamespace(commit=lambda: None)
+
+    async def search(name):
+        events.append(("start", name))
+        await asyncio.sleep(0.05)
+        events.append(("finish", name))
+        return name
+
+    async def wiki():
+        return await search("wiki")
+
+    async def core():
+        return await search("core")
+
+    async def combine(wiki_results, core_results):
+        return [wiki_results, core_results]
+
+    pipeline = pipeline_engine.Pipeline("test", [
+        pipeline_engine.Step("Wiki", "Search Wikipedia", wiki, output="wiki_results"),
+        pipeline_engine.Step("Core", "Search CORE", core, output="core_results"),
+        pipeline_engine.Step("Combine", "Combine", combine,
+                    inputs=("wiki_results", "core_results"), output="combined"),
+    ])
+    hypothesis = SimpleNamespace(id="H1", status="Processing")
+    results = asyncio.run(pipeline.run(hypothesis, db))
+    # Both searches start before either of them finishes
+    assert [event for event, _ in events] == ["start", "start", "finish", "finish"]
+    assert results["combined"] == ["wiki", "core"] and hypothesis.status == "Completed"
+    assert updates[-2:] == [("Combine", "start"), ("Combine", "done")]
+
+    # Steps whose results are given are skipped
+    updates.clear()
+    asyncio.run(pipeline.run(hypothesis, db, {"wiki_results": "cached", "core_results": "cached"}))
+    assert [step for step, _ in updates] == ["Combine", "Combine"]
+
+    async def halt():
+        raise pipeline_engine.PipelineHalt("InsufficientSources", "Nothing found.")
+
+    hypothesis.status = "Processing"
+    asyncio.run(pipeline_engine.Pipeline("halt", [
+        pipeline_engine.Step("Halt", "Halt", halt)
+    ]).run(hypothesis, db))
+    assert hypothesis.status == "InsufficientSources"
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    updates.clear()
+    hypothesis.status = "Processing"
+    asyncio.run(pipeline_engine.Pipeline("slow", [
+        pipeline_engine.Step("Slow", "Slow step", slow, timeout=0.05)
+    ]).run(hypothesis, db))
+    assert hypothesis.status == "Failed" and ("Slow", "error") in updates
+
+    # A failure while no step runs is reported on the pipeline itself
+    updates.clear()
+    hypothesis.status = "Processing"
+    failing_db = SimpleNamespace(commit=Mock(side_effect=[RuntimeError("database is gone"), None]))
+    asyncio.run(pipeline.run(hypothesis, failing_db, dict(results)))
+    assert hypothesis.status == "Failed" and updates == [("test", "error")]
+
+    try:
+        pipeline_engine.Pipeline("invalid", [
+            pipeline_engine.Step("Combine", "Combine", combine, inputs=("missing",))
+        ])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+@pytest.mark.usefixtures("ignore_updates")
+def test_failed_pipeline_run_resumes_from_checkpoints():
+    """Tests that a retried run skips the steps whose outputs were checkpointed."""
+    db = TestingSessionLocal()
+    hypothesis = Hypothesis(id="HRESUME", user_id="U1", content="Claim", content_hash="hash")
+    db.add(hypothesis)
+    db.commit()
+
+    calls = {"search": 0, "evaluate": 0}
+
+    async def search():
+        calls["search"] += 1
+        return [{"title": "Result"}]
+
+    async def evaluate(search_results):
+        calls["evaluate"] += 1
+        if calls["evaluate"] == 1:
+            raise RuntimeError("LLM unavailable")
+        return {"classification": "A", "sources": search_results}
+
+    pipeline = pipeline_engine.Pipeline("test_resume", [
+        pipeline_engine.Step("Search", "Search", search, output="search_results"),
+        pipeline_engine.Step("Evaluate", "Evaluate", evaluate,
+                             inputs=("search_results",), output="evaluation"),
+    ])
+
+    async def attempt():
+        pipeline_run = crud_pipeline_runs.claim_resumable_run(db, hypothesis.id, "hash") \
+            or crud_pipeline_runs.create_run(db, hypothesis)
+        results = await pipeline.run(hypothesis, db, pipeline_run=pipeline_run)
+        crud_pipeline_runs.finish_run(db, pipeline_run, hypothesis.status)
+        return pipeline_run.id, results
+
+    first_run, _ = asyncio.run(attempt())
+    assert hypothesis.status == "Failed"
+
+    second_run, results = asyncio.run(attempt())
+    assert second_run == first_run and hypothesis.status == "Completed"
+    assert calls == {"search": 1, "evaluate": 2}
+    assert results["evaluation"]["sources"] == [{"title": "Result"}]
+
+    # A completed run is not resumed
+    assert crud_pipeline_runs.claim_resumable_run(db, hypothesis.id, "hash") is None
+
+    # A running run is only resumed once its heartbeat is stale, and only once
+    running = crud_pipeline_runs.create_run(db, hypothesis)
+    assert crud_pipeline_runs.claim_resumable_run(db, hypothesis.id, "hash") is None
+    running.heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=600)
+    db.commit()
+    assert crud_pipeline_runs.claim_resumable_run(db, hypothesis.id, "hash").id == running.id
+    assert crud_pipeline_runs.claim_resumable_run(db, hypothesis.id, "hash") is None
+    db.close()
+
+@pytest.mark.usefixtures("ignore_updates", "fake_llm")
+def test_metrics_record_steps_llm_usage_and_caches():
+    """Tests that step durations, token costs and cache counters are exposed."""
+    async def ask():
+        return await llm.chat_completion([{"role": "user", "content": "?"}], model="gpt-4o-mini")
+
+    pipeline = pipeline_engine.Pipeline("test_metrics", [
+        pipeline_engine.Step("Ask", "Ask", ask, output="answer"),
+    ])
+    hypothesis = SimpleNamespace(id="H1", status="Processing")
+    cost_labels = {"model": "gpt-4o-mini"}
+    cost = REGISTRY.get_sample_value("llm_cost_usd_total", cost_labels) or 0.0
+    asyncio.run(pipeline.run(hypothesis, SimpleNamespace(commit=lambda: None)))
+
+    # 1000 prompt and 100 completion tokens at 0.15 and 0.60 USD per million
+    spent = REGISTRY.get_sample_value("llm_cost_usd_total", cost_labels) - cost
+    assert abs(spent - 0.00021) < 1e-9
+
+    cache = MemoryCache()
+    cache.hits, cache.misses = 3, 1
+    metrics.register_cache("test_cache", metrics.tiered_cache_stats(TieredCache(cache, ttl=60)))
+    exposition = generate_latest().decode()
+    assert 'pipeline_step_duration_seconds_count{outcome="success",pipeline="test_metrics",' \
+        'step="Ask"} 1.0' in exposition
+    assert 'pipeline_run_duration_seconds_count{pipeline="test_metrics",status="Completed"} 1.0' \
+        in exposition
+    assert 'cache_hits_total{cache="test_cache",tier="MemoryCache"} 3.0' in exposition
+    assert 'cache_hits_total{cache="core_search",tier="RedisCache"}' in exposition
+
+@pytest.mark.usefixtures("ignore_updates", "fake_llm")
+def test_tracing_records_nested_spans_per_hypothesis():
+    """Tests that pipeline, step, LLM and commit spans form one trace per hypothesis."""
+    exported = []
+    tracing.configure_tracing(SimpleNamespace(export=exported.extend))
+    db = TestingSessionLocal()
+
+    async def ask():
+        answer = await llm.chat_completion([{"role": "user", "content": "?"}])
+        db.commit()
+        return answer
+
+    pipeline = pipeline_engine.Pipeline("test_trace", [
+        pipeline_engine.Step("Ask", "Ask", ask, output="answer"),
+    ])
+    hypothesis = SimpleNamespace(id="HTRACE", status="Processing")
+    remote = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+
+    async def validate():
+        with tracing.span("validation", {"hypothesis.id": "HTRACE"}, traceparent=remote):
+            await pipeline.run(hypothesis, db)
+
+    try:
+        asyncio.run(validate())
+    finally:
+        tracing.shutdown_tracing()
+        db.close()
+
+    spans = {span.name: span for span in exported}
+    assert {"validation", "pipeline.test_trace", "test_trace.Ask", "llm.chat", "db.commit"} \
+        <= set(spans)
+    assert spans["validation"].parent_id == "b" * 16
+    assert spans["pipeline.test_trace"].parent_id == spans["validation"].span_id
+    assert spans["test_trace.Ask"].parent_id == spans["pipeline.test_trace"].span_id
+    assert spans["llm.chat"].parent_id == spans["test_trace.Ask"].span_id
+    assert spans["llm.chat"].attributes["llm.prompt_tokens"] == 1000
+    assert all(span.trace_id == "a" * 32 for span in exported)
+    assert all(span.attributes["hypothesis.id"] == "HTRACE" for span in exported)
+    assert all(span.end_ns >= span.start_ns for span in exported)
+
+def test_traced_requests_pass_the_hypothesis_id_to_handler_spans():
+    """Tests that spans opened by a route handler inherit the hypothesis ID of the route."""
+    app = FastAPI()
+    app.middleware("http")(tracing.trace_requests)
+
+    @app.get("/hypotheses/{hypothesis_id}")
+    async def read(hypothesis_id: str):
+        with tracing.span("handler"):
+            return {"id": hypothesis_id}
+
+    exported = []
+    tracing.configure_tracing(SimpleNamespace(export=exported.extend))
+    try:
+        assert TestClient(app).get("/hypotheses/HREQ").json() == {"id": "HREQ"}
+    finally:
+        tracing.shutdown_tracing()
+
+    spans = {span.name: span for span in exported}
+    assert spans["handler"].attributes["hypothesis.id"] == "HREQ"
+    assert spans["GET /hypotheses/{hypothesis_id}"].attributes["http.status_code"] == 200
+
+def test_progress_hub_routes_events_and_replays_missed_ones():
+    """Tests that SSE subscribers share a Redis connection, get only their events and can resume."""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    hub = ProgressHub(redis, queue_size=3)
+
+    async def scenario():
+        async with hub.subscribe("H1") as first, hub.subscribe("H1") as second, \
+                hub.subscribe("H2") as other:
+            assert (await redis.pubsub_numsub(progress_key("H1")))[0][1] == 1
+
+            event_ids = [
+                await publish_progress(redis, "H1", {"id": "H1", "step": step})
+                for step in ["A", "B", "C", "D"]
+            ]
+            await publish_progress(redis, "H2", {"id": "H2", "step": "A"})
+            await redis.publish(progress_key("H1"), "not an event")
+            await asyncio.sleep(0.05)
+
+            # A full queue drops its oldest events
+            assert [first.get_nowait().data["step"] for _ in range(3)] == ["B", "C", "D"]
+            assert second.qsize() == 3
+            event = other.get_nowait()
+            assert event.data == {"id": "H2", "step": "A"} and json.loads(event.raw) == event.data
+            assert other.empty() and hub.subscriber_count() == 3
+
+        assert hub.subscriber_count() == 0
+        await asyncio.sleep(0.05)
+        assert (await redis.pubsub_numsub(progress_key("H1")))[0][1] == 0
+
+        # A reconnecting client receives the events after the last one it saw
+        async with hub.subscribe("H1", last_event_id=event_ids[1]) as resumed:
+            await publish_progress(redis, "H1", {"id": "H1", "step": "E"})
+            await asyncio.sleep(0.05)
+            steps = []
+            while not resumed.empty():
+                steps.append(resumed.get_nowait().data["step"])
+            assert steps == ["C", "D", "E"]
+
+        await hub.close()
+
+    asyncio.run(scenario())
+
+def test_sse_progress_streams_events_with_keepalives(monkeypatch):
+    """Tests that the SSE stream sends events as they arrive and keep-alives while idle."""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(sse, "progress_hub", ProgressHub(redis))
+    monkeypatch.setattr(sse, "SSE_KEEPALIVE_INTERVAL", 0.1)
+
+    async def scenario():
+        response = await sse.sse_progress("H1", last_event_id=None)
+        stream = response.body_iterator
+        first = asyncio.create_task(anext(stream))
+        await asyncio.sleep(0.02)
+
+        # Published well within the keep-alive interval, the event must be sent first
+        event_id = await publish_progress(redis, "H1", {"id": "H1", "step": "Searching"})
+        assert await first == f'id: {event_id}\ndata: {{"id": "H1", "step": "Searching"}}\n\n'
+
+        assert await anext(stream) == ": keep-alive\n\n"
+        await stream.aclose()
+        assert sse.progress_hub.subscriber_count() == 0
+        await sse.progress_hub.close()
+
+    asyncio.run(scenario())